@@ -0,0 +1,155 @@
+"""
+asyncio execution engine for AVScheduler.
+
+Jobs run as coroutines on a single event loop driven by APScheduler's
+`AsyncIOScheduler`. Child processes are started with
+`asyncio.create_subprocess_exec`, their output is read without blocking and
+they are reaped through the loop's child watcher, so thousands of long-running
+jobs can be in flight without one OS thread each.
+
+Enable it with `engine = "asyncio"` in the `[settings]` table.
+"""
+
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import resource
+import sys
+from asyncio.subprocess import PIPE
+from datetime import datetime
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+import tracing
+
+# Descriptors held by each running job: stdout and stderr pipes plus a pidfd
+FDS_PER_JOB = 3
+# Descriptors left for SQLite, log files, sockets and the loop itself
+RESERVED_FDS = 256
+
+_spawn_slots = None
+
+
+def _install_child_watcher(loop):
+    """
+    Reap children of `loop` through pidfds where available.
+
+    Before Python 3.12 the default `ThreadedChildWatcher` starts one thread per
+    child process, which defeats the purpose of this engine. 3.12+ already
+    uses pidfds when the kernel supports them.
+    """
+    if sys.version_info >= (3, 12) or not hasattr(asyncio, "PidfdChildWatcher"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except (AttributeError, OSError):
+        logging.warning("pidfd_open unavailable; asyncio engine falls back to one watcher thread per job.")
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    # set_child_watcher only attaches to a loop already set as current, so
+    # attach explicitly; an unattached watcher rejects every subprocess
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+
+def _raise_fd_limit():
+    """
+    Raise the soft RLIMIT_NOFILE to the hard limit and return the result.
+
+    The usual soft limit of 1024 would otherwise cap the engine at roughly
+    300 running jobs before spawning fails with EMFILE.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        target = hard if hard != resource.RLIM_INFINITY else max(soft, 1 << 20)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError) as e:
+            logging.warning(f"Could not raise the open file limit from {soft}: {e}")
+    return soft
+
+
+def create_scheduler():
+    """
+    Create an `AsyncIOScheduler` bound to a fresh event loop.
+
+    Must be called in the process that will run the loop (i.e. after
+    daemonizing), since the loop owns file descriptors.
+    """
+    global _spawn_slots
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    _install_child_watcher(loop)
+
+    # Whatever limit remains, queue spawns beyond it instead of failing them
+    fd_limit = _raise_fd_limit()
+    slots = max(1, (fd_limit - RESERVED_FDS) // FDS_PER_JOB)
+    _spawn_slots = asyncio.Semaphore(slots)
+    logging.info(f"asyncio engine: open file limit {fd_limit}, up to {slots} concurrent job processes.")
+    return AsyncIOScheduler(event_loop=loop)
+
+
+def run_forever(async_scheduler):
+    """
+    Start the scheduler and block running its event loop.
+    """
+    loop = asyncio.get_event_loop()
+    async_scheduler.start()
+    try:
+        loop.run_forever()
+    finally:
+        if async_scheduler.running:
+            async_scheduler.shutdown(wait=False)
+        loop.close()
+
+
+async def run_job_async(job_id, interpreter, command, env_file=None, inputs=None, group=None, queue_wait=None):
+    """
+    Coroutine counterpart of `scheduler.run_job`.
+
+    Input fingerprinting and database and log-file writes are handed to the
+    loop's default executor so a slow disk never stalls other running jobs.
+    """
+    from scheduler import check_inputs, load_env, log_skipped_run, log_to_db, log_to_file, record_inputs
+
+    loop = asyncio.get_running_loop()
+    with tracing.trace("run_job", job_id=job_id, engine="asyncio", group=group or "", queue_wait=queue_wait or 0.0) as run_span:
+        start_time = datetime.now()
+
+        with tracing.span("run_job.load_env"):
+            env = load_env(env_file)
+
+        fingerprint = None
+        if inputs:
+            with tracing.span("run_job.fingerprint"):
+                fingerprint, unchanged = await loop.run_in_executor(
+                    None, check_inputs, job_id, inputs, env, interpreter, command, env_file
+                )
+            if unchanged:
+                run_span.set_attribute("status", "skipped")
+                await loop.run_in_executor(None, log_skipped_run, job_id, start_time, group, queue_wait)
+                return
+
+        async with _spawn_slots or contextlib.nullcontext():
+            with tracing.span("run_job.spawn", interpreter=interpreter):
+                process = await asyncio.create_subprocess_exec(
+                    interpreter, "-c", command, stdout=PIPE, stderr=PIPE, env=env
+                )
+            with tracing.span("run_job.communicate", pid=process.pid):
+                stdout, stderr = await process.communicate()
+        exit_code = process.returncode
+        run_span.set_attribute("exit_code", exit_code)
+
+        end_time = datetime.now()
+        execution_time = (end_time - start_time).total_seconds()
+        with tracing.span("run_job.log_to_db"):
+            await loop.run_in_executor(
+                None, functools.partial(log_to_db, job_id, exit_code, execution_time, group=group, queue_wait=queue_wait)
+            )
+        with tracing.span("run_job.log_to_file"):
+            await loop.run_in_executor(None, log_to_file, job_id, exit_code, execution_time, stdout, stderr)
+        if fingerprint:
+            await loop.run_in_executor(None, record_inputs, job_id, fingerprint, exit_code == 0)
@@ -4,13 +4,18 @@
 
 import os
 import signal
-import sqlite3
 import toml
 
 import click
 
 from tabulate import tabulate
 
+import export as export_module
+import forecast as forecast_module
+import history
+import scheduler as scheduler_module
+from config_compiler import ConfigError
+from models import from_epoch_us, to_epoch_us
 from scheduler import start_daemon, CONFIG, load_config, scheduler, run_job
 from utils import get_valid_directory
 
@@ -37,6 +42,8 @@ def start(daemonize):
     """
     config = load_config(CONFIG_FILE)
     CONFIG = config
+    for error in scheduler_module.CONFIG_ERRORS:
+        click.echo(f"Warning: {error} (job will not be scheduled)")
     pid_file = config["settings"].get("pid_file", "/tmp/avscheduler.pid")
 
     # Check if the daemon is already running
@@ -128,26 +135,15 @@ def list_jobs():
         click.echo("No jobs found in the configuration.")
         return
 
-    # Connect to the database to fetch job logs
-    conn = sqlite3.connect(config["settings"]["db_path"])
-    cursor = conn.cursor()
+    # Fetch the latest execution of each job, newest history partition first
+    latest = history.latest_logs(config["settings"]["db_path"], jobs.keys())
 
-    # Fetch job execution history for each job
     results = {}
     for job_id in jobs.keys():
-        cursor.execute(
-            """
-            SELECT timestamp, exit_code, execution_time
-            FROM job_execution_logs
-            WHERE job_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 1
-            """,
-            (job_id,),
-        )
-        row = cursor.fetchone()
+        row = latest.get(job_id)
         if row:
             last_execution, last_exit_code, last_execution_time = row
+            last_execution = from_epoch_us(last_execution)
         else:
             last_execution, last_exit_code, last_execution_time = "N/A", "N/A", "N/A"
 
@@ -163,8 +159,6 @@ def list_jobs():
             "condition": jobs[job_id].get("condition", "N/A"),
         }
 
-    conn.close()
-
     # Display results in a table
     table = [
         [
@@ -315,29 +309,17 @@ def view_logs(job_id):
         click.echo("Error: Missing 'settings' or 'db_path' in the configuration file.")
         return
 
-    # Connect to the database
-    conn = sqlite3.connect(config["settings"]["db_path"])
-    cursor = conn.cursor()
-
     # Fetch logs
-    if job_id:
-        cursor.execute(
-            """
-            SELECT * FROM job_execution_logs WHERE job_id = ? ORDER BY timestamp DESC
-            """,
-            (job_id,),
-        )
-    else:
-        cursor.execute("SELECT * FROM job_execution_logs ORDER BY timestamp DESC")
-
-    logs = cursor.fetchall()
-    conn.close()
+    logs = [
+        (log_id, job, exit_code, execution_time, from_epoch_us(timestamp), *rest)
+        for log_id, job, exit_code, execution_time, timestamp, *rest in history.iter_logs(config["settings"]["db_path"], job_id=job_id)
+    ]
 
     if not logs:
         click.echo("No logs found.")
         return
 
-    headers = ["ID", "Job ID", "Exit Code", "Execution Time (s)", "Timestamp"]
+    headers = ["ID", "Job ID", "Exit Code", "Execution Time (s)", "Timestamp", "Status", "Group", "Queue Wait (s)"]
     click.echo(tabulate(logs, headers=headers, tablefmt="grid"))
 
 @click.command()
@@ -355,24 +337,160 @@ def cleanup_logs(job_id, before, all):
         click.echo("You must specify either --before or --all.")
         return
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
     try:
         if all:
-            cursor.execute("DELETE FROM job_execution_logs WHERE job_id = ?", (job_id,))
+            history.delete_logs(db_path, job_id)
             click.echo(f"Deleted all logs for job '{job_id}'.")
         elif before:
-            cursor.execute(
-                "DELETE FROM job_execution_logs WHERE job_id = ? AND timestamp < ?",
-                (job_id, before),
-            )
+            history.delete_logs(db_path, job_id, before=before)
             click.echo(f"Deleted logs for job '{job_id}' before {before}.")
-        conn.commit()
     except Exception as e:
         click.echo(f"Error cleaning logs: {e}")
-    finally:
-        conn.close()
+
+
+@click.command()
+@click.option("--keep-months", type=int, required=True, help="Number of calendar months of history to keep, counting the current month.")
+def expire_history(keep_months):
+    """
+    Drop whole months of execution history for all jobs.
+    """
+    config = load_config(CONFIG_FILE)
+
+    if keep_months < 1:
+        click.echo("--keep-months must be at least 1.")
+        return
+
+    expired = history.expire_partitions(config["settings"]["db_path"], keep_months)
+    if expired:
+        click.echo(f"Expired history for {', '.join(sorted(expired))}.")
+    else:
+        click.echo("No history partitions to expire.")
+
+
+@click.command()
+def check_config():
+    """
+    Validate every job in the configuration and report all errors.
+    """
+    try:
+        load_config(CONFIG_FILE)
+    except ConfigError as e:
+        raise click.ClickException(str(e))
+
+    errors = scheduler_module.CONFIG_ERRORS
+    if errors:
+        for error in errors:
+            click.echo(f"Error: {error}")
+        raise click.ClickException(f"{len(errors)} configuration error(s) found.")
+
+    click.echo(f"Configuration OK: {len(scheduler_module.TRIGGERS)} job(s) validated.")
+
+
+@click.command()
+@click.option("--horizon", type=click.Choice(sorted(forecast_module.HORIZONS)), default="day", help="Forecast horizon.")
+@click.option("--window", type=click.IntRange(1), default=15, show_default=True, help="Overlap window length in minutes.")
+@click.option("--top", type=click.IntRange(1), default=5, show_default=True, help="Number of worst overlap windows to show.")
+@click.option("--heatmap/--no-heatmap", default=True, help="Print the per-minute concurrency heatmap.")
+def forecast(horizon, window, top, heatmap):
+    """
+    Forecast job concurrency from upcoming fire times and historical durations.
+    """
+    config = load_config(CONFIG_FILE)
+    durations = history.average_durations(config["settings"]["db_path"])
+    result = forecast_module.forecast(
+        config.get("jobs", {}), scheduler_module.TRIGGERS, durations, horizon=horizon, window=window, top=top
+    )
+
+    click.echo(
+        f"{result['runs']} runs between {result['start']:%Y-%m-%d %H:%M} and {result['end']:%Y-%m-%d %H:%M}; "
+        f"peak concurrency {result['peak']['concurrency']:.1f} at {result['peak']['time']:%Y-%m-%d %H:%M}."
+    )
+    if heatmap:
+        click.echo(f"\nConcurrency heatmap (one column per minute, '{forecast_module.SHADES[-1]}' = peak):")
+        click.echo(forecast_module.render_heatmap(result))
+
+    if not result["windows"]:
+        click.echo("\nNo runs forecast in this horizon.")
+        return
+
+    table = [
+        [
+            f"{w['start']:%Y-%m-%d %H:%M}",
+            f"{w['end']:%H:%M}",
+            f"{w['avg_concurrency']:.1f}",
+            f"{w['peak_concurrency']:.1f}",
+            len(w["jobs"]),
+            ", ".join(w["jobs"][:5]) + (" ..." if len(w["jobs"]) > 5 else ""),
+        ]
+        for w in result["windows"]
+    ]
+    headers = ["Window Start", "End", "Avg Concurrency", "Peak Concurrency", "Jobs Firing", "Top Jobs"]
+    click.echo("\n" + tabulate(table, headers=headers, tablefmt="grid"))
+
+
+@click.command()
+@click.option("--since", default=None, help="Only include runs since a timestamp (format: YYYY-MM-DD HH:MM:SS).")
+def queue_stats(since):
+    """
+    Show dispatch queue wait times per job group.
+    """
+    config = load_config(CONFIG_FILE)
+    stats = history.queue_wait_stats(config["settings"]["db_path"], since=since)
+    if not stats:
+        click.echo("No dispatched runs found.")
+        return
+
+    table = [
+        [group or "N/A", runs, f"{average:.3f}", f"{longest:.3f}"]
+        for group, (runs, average, longest) in sorted(stats.items(), key=lambda item: item[0] or "")
+    ]
+    headers = ["Group", "Runs", "Avg Queue Wait (s)", "Max Queue Wait (s)"]
+    click.echo(tabulate(table, headers=headers, tablefmt="grid"))
+
+
+def _parse_timestamp(ctx, param, value):
+    """
+    Parse a timestamp option into epoch microseconds up front, before any output is written.
+    """
+    if value is None:
+        return None
+    try:
+        return to_epoch_us(value)
+    except ValueError:
+        raise click.BadParameter(f"'{value}' is not a timestamp (format: YYYY-MM-DD HH:MM:SS).")
+
+
+@click.command()
+@click.option("--format", "fmt", type=click.Choice(export_module.FORMATS), default="csv", show_default=True, help="Output format.")
+@click.option("--output", "-o", default="-", help="Output file ('-' for stdout; Parquet needs a file).")
+@click.option("--job-id", default=None, help="Only export logs of this job.")
+@click.option("--since", default=None, callback=_parse_timestamp, help="Only export runs at or after a timestamp (format: YYYY-MM-DD HH:MM:SS).")
+@click.option("--until", default=None, callback=_parse_timestamp, help="Only export runs before a timestamp (format: YYYY-MM-DD HH:MM:SS).")
+@click.option("--incremental", default=None, metavar="NAME", help="Only export runs newer than the last export under this bookmark name.")
+@click.option("--chunk-size", type=click.IntRange(1), default=export_module.DEFAULT_CHUNK_SIZE, show_default=True, help="Rows read per chunk.")
+def export(fmt, output, job_id, since, until, incremental, chunk_size):
+    """
+    Stream execution history to CSV, JSON lines or Parquet.
+    """
+    config = load_config(CONFIG_FILE)
+    chunks = export_module.iter_chunks(
+        config["settings"]["db_path"], job_id=job_id, since=since, until=until, bookmark=incremental, chunk_size=chunk_size
+    )
+
+    if fmt == "parquet":
+        if output == "-":
+            raise click.UsageError("Parquet export needs --output FILE.")
+        try:
+            rows = export_module.write_parquet(chunks, output)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Exported {rows} rows to {output}.", err=True)
+        return
+
+    encode = export_module.encode_csv if fmt == "csv" else export_module.encode_jsonl
+    with click.open_file(output, "w", encoding="utf-8") as f:
+        for block in encode(chunks):
+            f.write(block)
 
 
 @click.command()
@@ -392,12 +510,17 @@ cli.add_command(restart)
 cli.add_command(status)
 cli.add_command(list_jobs)
 cli.add_command(cleanup_logs)
+cli.add_command(expire_history)
 cli.add_command(run_single_job)
 cli.add_command(add_job)
 cli.add_command(edit_job)
 cli.add_command(delete_job)
 cli.add_command(view_logs)
+cli.add_command(export)
 cli.add_command(reload_config)
+cli.add_command(check_config)
+cli.add_command(forecast)
+cli.add_command(queue_stats)
 
 
 if __name__ == "__main__":
@@ -1,24 +1,18 @@
-import sqlite3
 from datetime import datetime, timedelta
 
+import history
+from models import to_epoch_us
+
 def evaluate_condition(condition, db_path, current_job_id):
     """
     Evaluate a condition expression using SQLite and job execution logs.
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
     # Parse condition: example -> "job_1.last_run_successful and job_1.finished_within(2h)"
+    # Runs skipped for unchanged inputs only follow a successful run, so they are
+    # ignored by last_run_successful but count as finished for finished_within.
     if "last_run_successful" in condition:
         job_id = condition.split(".")[0]
-        cursor.execute(
-            """
-            SELECT exit_code FROM job_execution_logs
-            WHERE job_id = ? ORDER BY timestamp DESC LIMIT 1
-            """,
-            (job_id,),
-        )
-        result = cursor.fetchone()
+        result = history.latest_log(db_path, job_id, ("exit_code",), exclude_skipped=True)
         if result is None or result[0] != 0:
             return False
 
@@ -27,18 +21,10 @@ def evaluate_condition(condition, db_path, current_job_id):
         time_delta = parse_time_string(time_str)
         cutoff_time = datetime.now() - time_delta
 
-        cursor.execute(
-            """
-            SELECT timestamp FROM job_execution_logs
-            WHERE job_id = ? ORDER BY timestamp DESC LIMIT 1
-            """,
-            (job_id,),
-        )
-        result = cursor.fetchone()
-        if result is None or datetime.fromisoformat(result[0]) < cutoff_time:
+        result = history.latest_log(db_path, job_id, ("timestamp",))
+        if result is None or result[0] < to_epoch_us(cutoff_time):
             return False
 
-    conn.close()
     return True
 
 def parse_time_string(time_str):
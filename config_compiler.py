@@ -0,0 +1,235 @@
+"""
+Config compiler for AVScheduler.
+
+Parses `config.toml` once, validates every job and builds its APScheduler
+trigger in a single pass, then stores the result in a binary snapshot next to
+the config file. The daemon, CLI and web UI all load the snapshot and only
+re-parse the TOML when the file's mtime/size and content hash change.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+from collections import namedtuple
+
+import apscheduler
+import tzlocal
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+try:
+    import tomllib
+
+    def _parse_toml(data):
+        return tomllib.loads(data.decode("utf-8"))
+except ImportError:
+    import toml
+
+    def _parse_toml(data):
+        return toml.loads(data.decode("utf-8"))
+
+SNAPSHOT_FORMAT = 1
+SCHEDULE_TYPES = ("cron", "interval", "date")
+
+CompiledConfig = namedtuple("CompiledConfig", ["config", "triggers", "errors"])
+
+
+class ConfigError(ValueError):
+    """
+    Raised when a configuration contains invalid jobs.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("Invalid configuration:\n" + "\n".join(f"  - {error}" for error in errors))
+
+
+def snapshot_path(config_file):
+    """
+    Return the snapshot file path for a configuration file.
+    """
+    directory, name = os.path.split(os.path.abspath(config_file))
+    return os.path.join(directory, f".{name}.snapshot")
+
+
+def build_trigger(job):
+    """
+    Build the APScheduler trigger for a job definition.
+    """
+    schedule_type = job.get("schedule_type", "cron")
+    if schedule_type == "cron":
+        return CronTrigger.from_crontab(job["schedule"])
+    if schedule_type == "interval":
+        return IntervalTrigger(seconds=job["interval_seconds"])
+    if schedule_type == "date":
+        return DateTrigger(run_date=job["run_date"])
+    raise ValueError(f"unknown schedule_type '{schedule_type}' (expected one of {', '.join(SCHEDULE_TYPES)})")
+
+
+def validate_config(config):
+    """
+    Validate a parsed configuration and build all job triggers.
+
+    Returns a `CompiledConfig`; jobs with errors are left out of `triggers`.
+    The config itself is never modified, since commands such as `add-job`
+    write it back to the file.
+    """
+    errors = []
+    triggers = {}
+    interpreters = config.get("interpreters", {})
+
+    jobs = config.get("jobs", {})
+    if not isinstance(jobs, dict):
+        return CompiledConfig(config, triggers, ["[jobs] must be a table"])
+
+    settings = config.get("settings", {})
+    max_concurrent = settings.get("max_concurrent_jobs", 0)
+    if not isinstance(max_concurrent, int) or isinstance(max_concurrent, bool) or max_concurrent < 0:
+        errors.append("settings: 'max_concurrent_jobs' must be a non-negative integer")
+    aging_seconds = settings.get("queue_aging_seconds", 60)
+    if not isinstance(aging_seconds, (int, float)) or isinstance(aging_seconds, bool) or aging_seconds <= 0:
+        errors.append("settings: 'queue_aging_seconds' must be a positive number")
+    sample_rate = settings.get("trace_sample_rate", 0.0)
+    if not isinstance(sample_rate, (int, float)) or isinstance(sample_rate, bool) or not 0.0 <= sample_rate <= 1.0:
+        errors.append("settings: 'trace_sample_rate' must be a number between 0.0 and 1.0")
+    if not isinstance(settings.get("trace_file", ""), str):
+        errors.append("settings: 'trace_file' must be a path string")
+
+    for name, group in config.get("groups", {}).items():
+        weight = group.get("weight", 1) if isinstance(group, dict) else None
+        if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight <= 0:
+            errors.append(f"groups.{name}: 'weight' must be a positive number")
+
+    for job_id, job in jobs.items():
+        prefix = f"jobs.{job_id}"
+        if not isinstance(job, dict):
+            errors.append(f"{prefix}: must be a table")
+            continue
+        job_errors = []
+
+        if not job.get("command"):
+            job_errors.append(f"{prefix}: missing 'command'")
+        job_type = job.get("type")
+        if not job_type:
+            job_errors.append(f"{prefix}: missing 'type'")
+        elif job_type not in interpreters:
+            job_errors.append(f"{prefix}: no interpreter configured for type '{job_type}'")
+
+        inputs = job.get("inputs", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if not isinstance(inputs, list) or not all(isinstance(pattern, str) for pattern in inputs):
+            job_errors.append(f"{prefix}: 'inputs' must be a list of file globs")
+        if not isinstance(job.get("input_env", []), list):
+            job_errors.append(f"{prefix}: 'input_env' must be a list of variable names")
+
+        if not isinstance(job.get("priority", 0), int):
+            job_errors.append(f"{prefix}: 'priority' must be an integer")
+        if not isinstance(job.get("group", ""), str):
+            job_errors.append(f"{prefix}: 'group' must be a string")
+
+        schedule_type = job.get("schedule_type", "cron")
+        required = {"cron": "schedule", "interval": "interval_seconds", "date": "run_date"}.get(schedule_type)
+        if required and required not in job:
+            job_errors.append(f"{prefix}: missing '{required}' for schedule_type '{schedule_type}'")
+        else:
+            try:
+                trigger = build_trigger(job)
+            except (ValueError, TypeError) as e:
+                job_errors.append(f"{prefix}: invalid schedule: {e}")
+
+        if job_errors:
+            errors.extend(job_errors)
+        else:
+            triggers[job_id] = trigger
+
+    return CompiledConfig(config, triggers, errors)
+
+
+def _local_timezone():
+    """
+    Name of the local timezone, which cron triggers are built (and pickled) with.
+    """
+    return str(tzlocal.get_localzone())
+
+
+def _read_snapshot(path, stat, digest=None):
+    """
+    Load the snapshot body if its header matches the config file.
+
+    The snapshot is only a cache: any failure to read it is treated as a miss.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if (
+                header.get("format") != SNAPSHOT_FORMAT
+                or header.get("apscheduler") != apscheduler.__version__
+                or header.get("timezone") != _local_timezone()
+            ):
+                return None
+            if digest is None:
+                if header["mtime_ns"] != stat.st_mtime_ns or header["size"] != stat.st_size:
+                    return None
+            elif header["sha256"] != digest:
+                return None
+            return CompiledConfig(*pickle.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # e.g. a newer pickle protocol or a timezone class that is no longer installed
+        logging.warning(f"Ignoring unreadable config snapshot {path}: {e!r}")
+        return None
+
+
+def _write_snapshot(path, stat, digest, compiled):
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "apscheduler": apscheduler.__version__,
+        "timezone": _local_timezone(),
+        "sha256": digest,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(tuple(compiled), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write config snapshot {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def compile_config(config_file="config.toml"):
+    """
+    Return the compiled configuration, reusing the cached snapshot if valid.
+
+    The snapshot is trusted outright when the config's mtime and size match;
+    otherwise the file is hashed and re-parsed only if its content changed.
+    """
+    if not os.path.exists(config_file):
+        raise FileNotFoundError(f"Configuration file '{config_file}' not found.")
+
+    path = snapshot_path(config_file)
+    stat = os.stat(config_file)
+    compiled = _read_snapshot(path, stat)
+    if compiled is not None:
+        return compiled
+
+    with open(config_file, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    compiled = _read_snapshot(path, stat, digest)
+    if compiled is None:
+        try:
+            config = _parse_toml(data)
+        except ValueError as e:
+            raise ConfigError([f"{config_file}: {e}"])
+        compiled = validate_config(config)
+    _write_snapshot(path, stat, digest, compiled)
+    return compiled
@@ -0,0 +1,190 @@
+"""
+Priority and fair-share dispatch queue.
+
+When `max_concurrent_jobs` is set in `[settings]`, triggered runs are not
+executed directly but queued here and started as execution slots free up:
+
+- Between groups, slots are shared by weighted fair queueing: each group has
+  a virtual time advanced by `1 / weight` per dispatched run, and the backlogged
+  group with the lowest virtual time goes next. Weights come from
+  `[groups.<name>] weight = N` (default 1).
+- Within a group, runs are ordered by job `priority` (higher first). Waiting
+  runs age: every `queue_aging_seconds` spent in the queue counts as one extra
+  priority level, so low-priority runs are never starved.
+
+A job that is already queued or running is not queued again, mirroring
+APScheduler's default `max_instances = 1`.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_GROUP = "default"
+
+Pending = namedtuple("Pending", ["job_id", "group", "func", "args", "kwargs", "enqueued"])
+
+
+class DispatchQueue:
+    """
+    Engine-independent queue state and selection policy.
+
+    Subclasses implement `_start(pending, queue_wait)`, which must eventually
+    call `_finish(pending)`.
+    """
+
+    def __init__(self, max_concurrent, weights=None, aging_seconds=60.0):
+        if aging_seconds <= 0:
+            raise ValueError("aging_seconds must be positive")
+        self.max_concurrent = max_concurrent
+        self.weights = weights or {}
+        self.aging_seconds = aging_seconds
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._vtime = {}
+        self._virtual_time = 0.0
+        self._active = set()
+        self._running = 0
+        self._seq = itertools.count()
+
+    def submit(self, job_id, group, priority, func, args, kwargs=None):
+        """
+        Queue a run. Returns False if the job is already queued or running.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if job_id in self._active:
+                logging.warning(f"Run of job {job_id} skipped: previous run is still queued or running.")
+                return False
+            self._active.add(job_id)
+
+            queue = self._queues.setdefault(group, [])
+            if not queue:
+                # A group returning from idle must not redeem credit banked while idle
+                self._vtime[group] = max(self._vtime.get(group, 0.0), self._virtual_time)
+            # Aging adds waited / aging_seconds to the priority; for runs of one
+            # group that is a fixed ordering by priority - enqueued / aging_seconds
+            key = -(priority - now / self.aging_seconds)
+            heapq.heappush(queue, (key, next(self._seq), Pending(job_id, group, func, args, kwargs or {}, now)))
+
+        self._pump()
+        return True
+
+    def pending(self):
+        """
+        Return the number of queued runs per group.
+        """
+        with self._lock:
+            return {group: len(queue) for group, queue in self._queues.items() if queue}
+
+    def _pump(self):
+        while True:
+            with self._lock:
+                if self._running >= self.max_concurrent:
+                    return
+                backlogged = [group for group, queue in self._queues.items() if queue]
+                if not backlogged:
+                    return
+                group = min(backlogged, key=lambda g: (self._vtime[g], g))
+                _, _, pending = heapq.heappop(self._queues[group])
+                self._virtual_time = self._vtime[group]
+                self._vtime[group] += 1.0 / self.weights.get(group, 1.0)
+                self._running += 1
+            self._start(pending, time.monotonic() - pending.enqueued)
+
+    def _finish(self, pending):
+        with self._lock:
+            self._running -= 1
+            self._active.discard(pending.job_id)
+        self._pump()
+
+    def _start(self, pending, queue_wait):
+        raise NotImplementedError
+
+
+class ThreadDispatcher(DispatchQueue):
+    """
+    Runs dispatched jobs on a pool of `max_concurrent` threads.
+    """
+
+    def __init__(self, max_concurrent, weights=None, aging_seconds=60.0):
+        super().__init__(max_concurrent, weights, aging_seconds)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="avscheduler-dispatch")
+
+    def _start(self, pending, queue_wait):
+        self._executor.submit(self._run, pending, queue_wait)
+
+    def _run(self, pending, queue_wait):
+        try:
+            pending.func(*pending.args, queue_wait=queue_wait, **pending.kwargs)
+        except Exception:
+            logging.exception(f"Job {pending.job_id} raised an exception.")
+        finally:
+            self._finish(pending)
+
+
+class AsyncDispatcher(DispatchQueue):
+    """
+    Runs dispatched coroutine jobs as tasks on the running event loop.
+
+    All methods must be called from the loop's thread; APScheduler does so
+    when the scheduled function is the `submit_async` coroutine.
+    """
+
+    def __init__(self, max_concurrent, weights=None, aging_seconds=60.0):
+        super().__init__(max_concurrent, weights, aging_seconds)
+        self._tasks = set()
+
+    async def submit_async(self, job_id, group, priority, func, args, kwargs=None):
+        return self.submit(job_id, group, priority, func, args, kwargs)
+
+    def _start(self, pending, queue_wait):
+        task = asyncio.get_running_loop().create_task(self._run(pending, queue_wait))
+        # Keep a reference so the task is not garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending, queue_wait):
+        try:
+            await pending.func(*pending.args, queue_wait=queue_wait, **pending.kwargs)
+        except Exception:
+            logging.exception(f"Job {pending.job_id} raised an exception.")
+        finally:
+            self._finish(pending)
+
+
+def _setting(value, default, valid):
+    """
+    Return `value` if `valid` accepts it, else `default`; the config compiler
+    has already reported invalid values.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not valid(value):
+        return default
+    return value
+
+
+def create_dispatcher(config, engine="thread"):
+    """
+    Build the dispatcher configured by `[settings]` and `[groups]`, or None
+    when `max_concurrent_jobs` is unset.
+
+    Invalid values fall back to their defaults.
+    """
+    settings = config.get("settings", {})
+    max_concurrent = _setting(settings.get("max_concurrent_jobs", 0), 0, lambda v: isinstance(v, int))
+    if max_concurrent <= 0:
+        return None
+
+    weights = {
+        name: float(_setting(group.get("weight", 1), 1, lambda v: v > 0))
+        for name, group in config.get("groups", {}).items()
+        if isinstance(group, dict)
+    }
+    aging_seconds = float(_setting(settings.get("queue_aging_seconds", 60), 60, lambda v: v > 0))
+    dispatcher_class = AsyncDispatcher if engine == "asyncio" else ThreadDispatcher
+    return dispatcher_class(max_concurrent, weights, aging_seconds)
@@ -0,0 +1,158 @@
+"""
+Streaming export of execution history.
+
+Rows are read from the history partitions through a cursor in fixed-size
+chunks and encoded chunk by chunk, so memory use does not depend on the size
+of the history. Supported formats are CSV, JSON lines and, when pyarrow is
+installed, Parquet.
+
+Incremental exports use a named bookmark stored in the main database: only
+rows newer than the bookmark are exported, and the bookmark is advanced once
+the export has completed. Rows from the last `BOOKMARK_LAG` are left for the
+next export, because concurrent writers may still be committing rows with
+earlier timestamps.
+"""
+
+import csv
+import io
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from itertools import islice
+
+import history
+from models import from_epoch_us, init_db, to_epoch_us
+
+FORMATS = ("csv", "jsonl", "parquet")
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+DEFAULT_CHUNK_SIZE = 10000
+BOOKMARK_LAG = timedelta(seconds=60)
+# Log ids are only unique within a monthly partition, so exports lead with it
+EXPORT_COLUMNS = ("partition",) + history.COLUMNS
+
+
+def get_bookmark(db_path, name):
+    """
+    Return the timestamp of the last row exported under a bookmark, if any.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT last_timestamp FROM export_bookmarks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def set_bookmark(db_path, name, last_timestamp):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT OR REPLACE INTO export_bookmarks (name, last_timestamp, updated_at) VALUES (?, ?, ?)",
+        (name, last_timestamp, to_epoch_us(datetime.now())),
+    )
+    conn.commit()
+    conn.close()
+
+
+def iter_chunks(
+    db_path, job_id=None, since=None, until=None, bookmark=None, chunk_size=DEFAULT_CHUNK_SIZE, advance_bookmark=True
+):
+    """
+    Yield lists of at most `chunk_size` log rows (history.COLUMNS), oldest first.
+
+    With `bookmark`, only rows newer than the bookmark and older than
+    `BOOKMARK_LAG` are yielded, and the bookmark is advanced after the last
+    chunk has been consumed unless `advance_bookmark` is false.
+    """
+    after = None
+    if bookmark:
+        init_db(db_path)
+        after = get_bookmark(db_path, bookmark)
+        # A row timestamped before the bookmark but committed after the export
+        # would never be exported, so stay clear of rows still being written
+        settled = to_epoch_us(datetime.now() - BOOKMARK_LAG)
+        until = min(to_epoch_us(until), settled) if until is not None else settled
+    rows = history.iter_logs(
+        db_path, job_id=job_id, since=since, until=until, after=after, newest_first=False, chunk_size=chunk_size
+    )
+    timestamp_index = history.COLUMNS.index("timestamp")
+    last_timestamp = None
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        last_timestamp = chunk[-1][timestamp_index]
+        yield chunk
+
+    if bookmark and advance_bookmark and last_timestamp is not None:
+        set_bookmark(db_path, bookmark, last_timestamp)
+
+
+def _export_rows(chunk, datetimes=True):
+    """
+    Prefix each row of a chunk with its partition month and, with `datetimes`,
+    replace its epoch-microsecond timestamp by a local datetime.
+    """
+    index = history.COLUMNS.index("timestamp")
+    rows = []
+    for row in chunk:
+        timestamp = from_epoch_us(row[index])
+        value = timestamp if datetimes else row[index]
+        rows.append((history.month_of(timestamp),) + row[:index] + (value,) + row[index + 1:])
+    return rows
+
+
+def encode_csv(chunks):
+    """
+    Encode row chunks as CSV text blocks, starting with a header row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in chunks:
+        writer.writerows(_export_rows(chunk))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_jsonl(chunks):
+    """
+    Encode row chunks as JSON-lines text blocks.
+    """
+    for chunk in chunks:
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n" for row in _export_rows(chunk))
+
+
+def write_parquet(chunks, sink):
+    """
+    Write row chunks to a Parquet file, one row group per chunk.
+
+    Returns the number of rows written. Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow).")
+
+    schema = pa.schema([
+        ("partition", pa.string()),
+        ("id", pa.int64()),
+        ("job_id", pa.string()),
+        ("exit_code", pa.int64()),
+        ("execution_time", pa.float64()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("status", pa.string()),
+        ("job_group", pa.string()),
+        ("queue_wait", pa.float64()),
+    ])
+    rows_written = 0
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks:
+            # Stored epoch microseconds map directly onto Arrow's UTC timestamp type
+            columns = [list(column) for column in zip(*_export_rows(chunk, datetimes=False))]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+            rows_written += len(chunk)
+    return rows_written
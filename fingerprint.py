@@ -0,0 +1,134 @@
+"""
+Input fingerprints for incremental jobs.
+
+A job may declare the inputs it depends on:
+
+    inputs = ["/data/incoming/*.csv"]   # file globs (recursive `**` allowed)
+    input_env = ["API_VERSION"]         # optional environment variables
+    input_hash = false                  # optional: hash file contents
+
+Before running, the scheduler fingerprints these inputs from file paths,
+mtimes and sizes (or content hashes when `input_hash` is set, so a bare
+`touch` does not trigger a run) and skips the run when the fingerprint
+matches the one stored by the job's last successful run. The job's
+interpreter, command and env file contents are part of the fingerprint, so
+editing the job itself also triggers a run.
+"""
+
+import glob
+import hashlib
+import os
+import sqlite3
+import stat
+import threading
+from datetime import datetime
+
+from models import to_epoch_us
+
+# (path, inode, mtime_ns, size) -> content digest
+CONTENT_HASH_CACHE_SIZE = 100000
+_content_hashes = {}
+_content_hashes_lock = threading.Lock()
+
+
+def input_spec(job):
+    """
+    Return the job's input declaration, or None if it declares no inputs.
+    """
+    globs = job.get("inputs")
+    if not globs:
+        return None
+    if isinstance(globs, str):
+        globs = [globs]
+    return {
+        "globs": list(globs),
+        "env": list(job.get("input_env", [])),
+        "hash": bool(job.get("input_hash", False)),
+    }
+
+
+def _content_hash(path, st):
+    key = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    with _content_hashes_lock:
+        digest = _content_hashes.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _content_hashes_lock:
+            if len(_content_hashes) >= CONTENT_HASH_CACHE_SIZE:
+                _content_hashes.clear()
+            _content_hashes[key] = digest
+    return digest
+
+
+def compute_fingerprint(spec, env, interpreter=None, command=None, env_file=None):
+    """
+    Fingerprint the files matched by the spec's globs and its env variables,
+    together with the job definition that would consume them.
+    """
+    h = hashlib.sha256()
+    h.update(f"run\0{interpreter}\0{command}\0".encode())
+    if env_file:
+        h.update(f"env_file\0{env_file}\0".encode())
+        try:
+            with open(env_file, "rb") as f:
+                h.update(hashlib.sha256(f.read()).hexdigest().encode())
+        except OSError:
+            h.update(b"missing")
+    for pattern in spec["globs"]:
+        h.update(f"glob\0{pattern}\0".encode())
+        for path in sorted(glob.glob(os.path.expanduser(pattern), recursive=True)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            if spec["hash"]:
+                try:
+                    h.update(f"{path}\0{st.st_size}\0{_content_hash(path, st)}\0".encode())
+                except OSError:
+                    continue
+            else:
+                h.update(f"{path}\0{st.st_size}\0{st.st_mtime_ns}\0".encode())
+    for name in spec["env"]:
+        h.update(f"env\0{name}\0{env.get(name)!r}\0".encode())
+    return h.hexdigest()
+
+
+def last_fingerprint(db_path, job_id):
+    """
+    Return the fingerprint stored by the job's last successful run, if any.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT fingerprint FROM job_input_fingerprints WHERE job_id = ?", (job_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def record_fingerprint(db_path, job_id, fingerprint, success):
+    """
+    Store the fingerprint after a successful run, or forget it after a failure
+    so the next run is never skipped.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    if success:
+        cursor.execute(
+            """
+            INSERT OR REPLACE INTO job_input_fingerprints (job_id, fingerprint, timestamp)
+            VALUES (?, ?, ?)
+            """,
+            (job_id, fingerprint, to_epoch_us(datetime.now())),
+        )
+    else:
+        cursor.execute("DELETE FROM job_input_fingerprints WHERE job_id = ?", (job_id,))
+    conn.commit()
+    conn.close()
@@ -0,0 +1,208 @@
+"""
+Schedule forecast for AVScheduler.
+
+Computes the upcoming fire times of every configured trigger over a horizon,
+merges them into one chronological stream with a k-way heap merge, and
+weights each run by the job's historical average duration to produce a
+per-minute concurrency heatmap and the worst overlap windows.
+
+Jobs sharing an identical trigger (e.g. many `0 * * * *` crontabs) are
+expanded once, which keeps a week of 10k jobs tractable.
+"""
+
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.triggers.interval import IntervalTrigger
+
+HORIZONS = {"day": 24 * 60, "week": 7 * 24 * 60}
+DEFAULT_DURATION = 60.0
+
+
+def _fire_times(trigger, start, end):
+    """
+    Yield the POSIX timestamps at which `trigger` fires in [start, end).
+    """
+    previous = None
+    while True:
+        fire_time = trigger.get_next_fire_time(previous, previous or start)
+        if fire_time is None or fire_time >= end:
+            return
+        if fire_time >= start:
+            yield fire_time.timestamp()
+        previous = fire_time
+
+
+def _tagged(stream, key):
+    for timestamp in stream:
+        yield timestamp, key
+
+
+def _group_jobs(jobs, triggers, start):
+    """
+    Group jobs by equivalent trigger so each schedule is expanded only once.
+    """
+    groups = {}
+    for job_id, trigger in triggers.items():
+        if isinstance(trigger, IntervalTrigger):
+            # Mirror the scheduler: interval jobs first fire one interval after start
+            seconds = jobs[job_id]["interval_seconds"]
+            trigger = IntervalTrigger(seconds=seconds, start_date=start + timedelta(seconds=seconds))
+        key = repr(trigger)
+        if key not in groups:
+            groups[key] = (trigger, [])
+        groups[key][1].append(job_id)
+    return groups
+
+
+def _add_run(full, partial, offset, duration):
+    """
+    Add one run of `duration` seconds starting `offset` seconds into the horizon.
+
+    Whole minutes go into the `full` difference array and the partial first
+    and last minutes into `partial`, so every run costs O(1).
+    """
+    end = offset + duration
+    first = int(offset // 60)
+    last = int(end // 60)
+    if first == last:
+        partial[first] += (end - offset) / 60
+        return
+    partial[first] += ((first + 1) * 60 - offset) / 60
+    full[first + 1] += 1
+    full[last] -= 1
+    partial[last] += (end - last * 60) / 60
+
+
+def _profile(durations, second):
+    """
+    Sparse load contributed by one fire of a trigger group, relative to its minute.
+
+    All jobs of a group fire together, so their runs are folded once into
+    (minute delta, value) pairs that are replayed for every fire time.
+    """
+    full = defaultdict(int)
+    partial = defaultdict(float)
+    for duration in durations:
+        _add_run(full, partial, second, duration)
+    return [(delta, count) for delta, count in full.items() if count], list(partial.items())
+
+
+def _worst_windows(load, window, top):
+    """
+    Pick the `top` non-overlapping windows of `window` minutes with the most load.
+    """
+    prefix = [0.0]
+    for value in load:
+        prefix.append(prefix[-1] + value)
+    sums = [(prefix[i + window] - prefix[i], i) for i in range(len(load) - window + 1)]
+    sums.sort(reverse=True)
+
+    chosen = []
+    for total, begin in sums:
+        if len(chosen) >= top or total <= 0:
+            break
+        if all(begin + window <= other or other + window <= begin for _, other in chosen):
+            chosen.append((total, begin))
+    return chosen
+
+
+def forecast(jobs, triggers, durations, horizon="week", window=15, top=5, start=None):
+    """
+    Forecast job concurrency over the horizon.
+
+    Returns a dict with the per-minute average concurrency (`load`), the peak
+    minute and the worst overlap windows, each listing the jobs that fire in it.
+    """
+    if window < 1 or top < 1:
+        raise ValueError("window and top must be at least 1")
+    minutes = HORIZONS[horizon]
+    start = (start or datetime.now(timezone.utc).astimezone()).replace(second=0, microsecond=0)
+    end = start + timedelta(minutes=minutes)
+    origin = start.timestamp()
+
+    groups = _group_jobs(jobs, triggers, start)
+    group_durations = {
+        key: [durations.get(job_id, DEFAULT_DURATION) for job_id in job_ids]
+        for key, (_, job_ids) in groups.items()
+    }
+
+    # Runs may extend past the horizon; pad so they need no clipping
+    padding = int(max((max(d) for d in group_durations.values() if d), default=0) // 60) + 2
+    full = [0] * (minutes + padding)
+    partial = [0.0] * (minutes + padding)
+    profiles = {}
+    runs = 0
+    streams = [_tagged(_fire_times(trigger, start, end), key) for key, (trigger, _) in groups.items()]
+    for timestamp, key in heapq.merge(*streams):
+        minute, second = divmod(timestamp - origin, 60)
+        minute = int(minute)
+        profile = profiles.get((key, second))
+        if profile is None:
+            profile = profiles[key, second] = _profile(group_durations[key], second)
+        for delta, count in profile[0]:
+            full[minute + delta] += count
+        for delta, value in profile[1]:
+            partial[minute + delta] += value
+        runs += len(group_durations[key])
+
+    load = []
+    running = 0
+    for minute in range(minutes):
+        running += full[minute]
+        load.append(running + partial[minute])
+
+    peak_minute = max(range(minutes), key=load.__getitem__) if minutes else 0
+    windows = []
+    for total, begin in _worst_windows(load, window, top):
+        window_start = start + timedelta(minutes=begin)
+        window_end = window_start + timedelta(minutes=window)
+        firing = defaultdict(int)
+        for trigger, job_ids in groups.values():
+            for _ in _fire_times(trigger, window_start, window_end):
+                for job_id in job_ids:
+                    firing[job_id] += 1
+        windows.append({
+            "start": window_start,
+            "end": window_end,
+            "avg_concurrency": total / window,
+            "peak_concurrency": max(load[begin:begin + window]),
+            "jobs": sorted(firing, key=lambda job_id: (-firing[job_id], job_id)),
+        })
+
+    return {
+        "start": start,
+        "end": end,
+        "minutes": minutes,
+        "runs": runs,
+        "load": load,
+        "peak": {"time": start + timedelta(minutes=peak_minute), "concurrency": load[peak_minute] if load else 0.0},
+        "windows": windows,
+    }
+
+
+def heatmap_rows(result):
+    """
+    Split the per-minute load into hourly rows of 60 values for display.
+    """
+    load = result["load"]
+    return [
+        (result["start"] + timedelta(minutes=offset), load[offset:offset + 60])
+        for offset in range(0, len(load), 60)
+    ]
+
+
+SHADES = " .:-=+*#%@"
+
+
+def render_heatmap(result):
+    """
+    Render the heatmap as text: one row per hour, one character per minute.
+    """
+    scale = max(result["load"], default=0.0) or 1.0
+    lines = []
+    for hour, values in heatmap_rows(result):
+        cells = "".join(SHADES[min(int(value / scale * (len(SHADES) - 1) + 0.999), len(SHADES) - 1)] for value in values)
+        lines.append(f"{hour:%a %Y-%m-%d %H:%M} |{cells}|")
+    return "\n".join(lines)
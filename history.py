@@ -0,0 +1,360 @@
+"""
+Time-partitioned execution history.
+
+Job execution logs are stored in one SQLite file per calendar month, in a
+directory next to the main database:
+
+    jobs.db
+    jobs.history/2026-09.db
+    jobs.history/2026-10.db
+
+Each partition holds a `job_execution_logs` table (see `models.JobExecutionLog`)
+with timestamps stored as integer epoch microseconds. Timestamp arguments may
+be datetimes, ISO strings or epoch microseconds; rows are returned with the
+raw integer, which `models.from_epoch_us` turns back into a datetime.
+Inserts and "latest run" lookups only touch the newest partitions, range
+queries open only the months they cover, and expiring a month is a single
+file unlink instead of row-by-row DELETEs.
+
+All readers and writers of execution history (scheduler, CLI, web UI,
+condition parser) go through this module.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from migrations import upgrade_partition
+from models import from_epoch_us, to_epoch_us
+
+TABLE = "job_execution_logs"
+COLUMNS = ("id", "job_id", "exit_code", "execution_time", "timestamp", "status", "job_group", "queue_wait")
+
+_PARTITION_RE = re.compile(r"^(\d{4}-\d{2})\.db$")
+_initialized = set()
+_initialized_lock = threading.Lock()
+
+
+def partition_dir(db_path):
+    """
+    Return the directory holding the history partitions of a database.
+    """
+    return f"{os.path.splitext(db_path)[0]}.history"
+
+
+def month_of(timestamp):
+    """
+    Return the "YYYY-MM" partition key of a datetime, ISO timestamp string or
+    epoch microseconds.
+    """
+    if isinstance(timestamp, int):
+        timestamp = from_epoch_us(timestamp)
+    if isinstance(timestamp, datetime):
+        return timestamp.strftime("%Y-%m")
+    return str(timestamp)[:7]
+
+
+def partition_path(db_path, month):
+    return os.path.join(partition_dir(db_path), f"{month}.db")
+
+
+def list_partitions(db_path):
+    """
+    Return the months that have a partition, newest first.
+    """
+    directory = partition_dir(db_path)
+    if not os.path.isdir(directory):
+        return []
+    months = [match.group(1) for match in map(_PARTITION_RE.match, os.listdir(directory)) if match]
+    return sorted(months, reverse=True)
+
+
+def _ensure_partition(db_path, month):
+    path = partition_path(db_path, month)
+    with _initialized_lock:
+        if path not in _initialized or not os.path.exists(path):
+            os.makedirs(partition_dir(db_path), exist_ok=True)
+            upgrade_partition(path)
+            _initialized.add(path)
+    return path
+
+
+def _connect(db_path, month):
+    """
+    Open an existing partition, upgrading its schema on first use in this process.
+    """
+    return sqlite3.connect(_ensure_partition(db_path, month))
+
+
+def _partitions_between(db_path, since=None, until=None):
+    """
+    Months overlapping [since, until), newest first.
+    """
+    low = month_of(since) if since else None
+    high = month_of(until) if until else None
+    return [m for m in list_partitions(db_path) if (low is None or m >= low) and (high is None or m <= high)]
+
+
+def _where(job_id=None, since=None, until=None, exclude_skipped=False, after=None):
+    clauses, params = [], []
+    if job_id is not None:
+        clauses.append("job_id = ?")
+        params.append(job_id)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(to_epoch_us(since))
+    if after is not None:
+        clauses.append("timestamp > ?")
+        params.append(to_epoch_us(after))
+    if until is not None:
+        clauses.append("timestamp < ?")
+        params.append(to_epoch_us(until))
+    if exclude_skipped:
+        clauses.append("status != 'skipped'")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def insert_log(db_path, job_id, exit_code, execution_time, status, timestamp=None, group=None, queue_wait=None):
+    """
+    Append an execution log to the partition of its month.
+    """
+    timestamp = timestamp or datetime.now()
+    conn = sqlite3.connect(_ensure_partition(db_path, month_of(timestamp)))
+    conn.execute(
+        f"""
+        INSERT INTO {TABLE} (job_id, exit_code, execution_time, timestamp, status, job_group, queue_wait)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (job_id, exit_code, execution_time, to_epoch_us(timestamp), status, group, queue_wait),
+    )
+    conn.commit()
+    conn.close()
+
+
+def latest_log(db_path, job_id, columns=("timestamp", "exit_code", "execution_time"), exclude_skipped=False):
+    """
+    Return the most recent log row of a job, searching the newest partition first.
+    """
+    where, params = _where(job_id=job_id, exclude_skipped=exclude_skipped)
+    for month in list_partitions(db_path):
+        conn = _connect(db_path, month)
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(columns)} FROM {TABLE}{where} ORDER BY timestamp DESC LIMIT 1", params
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is not None:
+            return row
+    return None
+
+
+def latest_logs(db_path, job_ids=None):
+    """
+    Return {job_id: (timestamp, exit_code, execution_time)} of each job's latest run.
+
+    With `job_ids`, stops at the first partition in which all of them were found.
+    """
+    remaining = set(job_ids) if job_ids is not None else None
+    results = {}
+    for month in list_partitions(db_path):
+        conn = _connect(db_path, month)
+        try:
+            # SQLite returns the bare columns of the row holding MAX(timestamp)
+            rows = conn.execute(
+                f"SELECT job_id, MAX(timestamp), exit_code, execution_time FROM {TABLE} GROUP BY job_id"
+            ).fetchall()
+        finally:
+            conn.close()
+        for job_id, timestamp, exit_code, execution_time in rows:
+            if job_id not in results and (remaining is None or job_id in remaining):
+                results[job_id] = (timestamp, exit_code, execution_time)
+                if remaining is not None:
+                    remaining.discard(job_id)
+        if remaining is not None and not remaining:
+            break
+    return results
+
+
+def iter_logs(
+    db_path, job_id=None, since=None, until=None, columns=COLUMNS, newest_first=True, chunk_size=1000, after=None
+):
+    """
+    Yield log rows across partitions in timestamp order, reading in chunks.
+
+    `since` is inclusive and `after` exclusive; `until` is exclusive.
+    """
+    where, params = _where(job_id=job_id, since=since, until=until, after=after)
+    lower = max((to_epoch_us(bound) for bound in (since, after) if bound is not None), default=None)
+    months = _partitions_between(db_path, lower, until)
+    if not newest_first:
+        months.reverse()
+    order = "DESC" if newest_first else "ASC"
+    for month in months:
+        conn = _connect(db_path, month)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {TABLE}{where} ORDER BY timestamp {order}", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+
+def average_durations(db_path):
+    """
+    Return the average execution time of every job over all partitions.
+
+    Runs skipped for unchanged inputs take no time and are left out.
+    """
+    where, params = _where(exclude_skipped=True)
+    totals = {}
+    for month in list_partitions(db_path):
+        conn = _connect(db_path, month)
+        try:
+            rows = conn.execute(
+                f"SELECT job_id, SUM(execution_time), COUNT(execution_time) FROM {TABLE}{where} GROUP BY job_id", params
+            ).fetchall()
+        finally:
+            conn.close()
+        for job_id, total, count in rows:
+            if count:
+                previous = totals.get(job_id, (0.0, 0))
+                totals[job_id] = (previous[0] + total, previous[1] + count)
+    return {job_id: total / count for job_id, (total, count) in totals.items()}
+
+
+def queue_wait_stats(db_path, since=None):
+    """
+    Return {group: (runs, average wait, max wait)} of dispatched runs since a timestamp.
+    """
+    where, params = _where(since=since)
+    where += (" AND" if where else " WHERE") + " queue_wait IS NOT NULL"
+    totals = {}
+    for month in _partitions_between(db_path, since):
+        conn = _connect(db_path, month)
+        try:
+            rows = conn.execute(
+                f"SELECT job_group, COUNT(*), SUM(queue_wait), MAX(queue_wait) FROM {TABLE}{where} GROUP BY job_group",
+                params,
+            ).fetchall()
+        finally:
+            conn.close()
+        for group, count, total, longest in rows:
+            runs, wait, previous_max = totals.get(group, (0, 0.0, 0.0))
+            totals[group] = (runs + count, wait + total, max(previous_max, longest))
+    return {group: (runs, wait / runs, longest) for group, (runs, wait, longest) in totals.items()}
+
+
+def delete_logs(db_path, job_id, before=None):
+    """
+    Delete a job's logs, optionally only those before a timestamp.
+
+    Only partitions up to the cutoff month are opened. Returns the number of
+    rows deleted.
+    """
+    where, params = _where(job_id=job_id, until=before)
+    deleted = 0
+    for month in _partitions_between(db_path, until=before):
+        conn = _connect(db_path, month)
+        try:
+            deleted += conn.execute(f"DELETE FROM {TABLE}{where}", params).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+    return deleted
+
+
+def expire_partitions(db_path, keep_months, today=None):
+    """
+    Unlink whole partitions older than the last `keep_months` calendar months,
+    counting the current month.
+
+    Returns the expired months.
+    """
+    if keep_months <= 0:
+        return []
+    today = today or datetime.now()
+    index = today.year * 12 + today.month - 1 - (keep_months - 1)
+    cutoff = f"{index // 12:04d}-{index % 12 + 1:02d}"
+    expired = [month for month in list_partitions(db_path) if month < cutoff]
+    for month in expired:
+        path = partition_path(db_path, month)
+        with _initialized_lock:
+            _initialized.discard(path)
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        logging.info(f"Expired execution history partition {month}.")
+    return expired
+
+
+def migrate_legacy_logs(db_path):
+    """
+    Move rows of the unpartitioned `job_execution_logs` table of the main
+    database into monthly partitions, then drop that table.
+
+    Each month's rows are inserted into its partition and deleted from the
+    main database in one transaction, so an interrupted migration resumes
+    without duplicating rows. Rows without a timestamp cannot be assigned a
+    partition; they are kept in `job_execution_logs_unmigrated`.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.create_function("to_epoch_us", 1, to_epoch_us, deterministic=True)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE,)).fetchone():
+            return
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")}
+        status = "status" if "status" in columns else "NULL"
+        status = f"COALESCE({status}, CASE WHEN exit_code = 0 THEN 'success' ELSE 'failed' END)"
+        months = [row[0] for row in conn.execute(f"SELECT DISTINCT substr(timestamp, 1, 7) FROM {TABLE}") if row[0]]
+        for month in months:
+            conn.execute("ATTACH DATABASE ? AS partition_db", (_ensure_partition(db_path, month),))
+            try:
+                # Commits to both files are atomic in rollback-journal mode
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    f"""
+                    INSERT INTO partition_db.{TABLE} (job_id, exit_code, execution_time, timestamp, status)
+                    SELECT job_id, exit_code, execution_time, to_epoch_us(timestamp), {status}
+                    FROM main.{TABLE} WHERE substr(timestamp, 1, 7) = ?
+                    """,
+                    (month,),
+                )
+                conn.execute(f"DELETE FROM main.{TABLE} WHERE substr(timestamp, 1, 7) = ?", (month,))
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.execute("DETACH DATABASE partition_db")
+
+        unmigrated = conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+        if unmigrated:
+            conn.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unmigrated")
+            logging.warning(
+                f"{unmigrated} execution log(s) without a timestamp were not migrated; "
+                f"they are kept in table {TABLE}_unmigrated of {db_path}."
+            )
+        else:
+            conn.execute(f"DROP TABLE {TABLE}")
+        logging.info(f"Migrated execution history into {len(months)} monthly partition(s).")
+    finally:
+        conn.close()
+
+
+def init_history(db_path, keep_months=0):
+    """
+    Prepare partitioned history on daemon start: migrate legacy rows and
+    apply the retention policy (`keep_months` <= 0 keeps everything).
+    """
+    migrate_legacy_logs(db_path)
+    _ensure_partition(db_path, month_of(datetime.now()))
+    if keep_months > 0:
+        expire_partitions(db_path, keep_months)
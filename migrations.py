@@ -0,0 +1,223 @@
+"""
+Versioned schema migrations.
+
+The main database and every execution history partition carry a
+`schema_version` table listing the migrations applied to them. Databases
+created from scratch are built from the models and stamped with the latest
+version; existing ones are brought up to date by running the pending
+migrations in order, each inside the same transaction as its version row.
+
+`migrate` runs on daemon start. History partitions are also upgraded the
+first time a process opens them (see `history._ensure_partition`), so CLI
+commands work against partitions written by an older version.
+
+To change the schema, update the models and append a migration to
+`MAIN_MIGRATIONS` or `HISTORY_MIGRATIONS`. Migrations use literal SQL so they
+keep producing the schema of their version when the models change later.
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy.dialects import sqlite as sqlite_dialect
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from models import Base, HistoryBase, JOB_STATUSES, to_epoch_us
+
+VERSION_TABLE = "schema_version"
+
+
+def _table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def _add_missing_columns(conn, table, columns):
+    """
+    Add nullable columns that older versions of a table did not have.
+    """
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for column in columns:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+
+def _rebuild_table(conn, table, create_sql, select_sql, indexes=()):
+    """
+    Recreate a table with a new definition, following SQLite's documented
+    create-copy-drop-rename procedure.
+
+    `create_sql` and `select_sql` contain a `{table}` placeholder; the select
+    must produce the new table's columns in order.
+    """
+    new_table = f"{table}_new"
+    conn.execute(create_sql.format(table=new_table))
+    if _table_exists(conn, table):
+        conn.execute(f"INSERT INTO {new_table} {select_sql.format(table=table)}")
+        conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+    for index in indexes:
+        conn.execute(index)
+
+
+def _history_epoch_timestamps(conn):
+    """
+    Store timestamps as epoch microseconds and status as a checked enum; index timestamp.
+    """
+    _add_missing_columns(conn, "job_execution_logs", ("status", "job_group", "queue_wait"))
+    # The new timestamp column is NOT NULL; set rows without one aside rather than drop them
+    untimed = conn.execute("SELECT COUNT(*) FROM job_execution_logs WHERE timestamp IS NULL").fetchone()[0]
+    if untimed:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_execution_logs_unmigrated AS SELECT * FROM job_execution_logs WHERE 0"
+        )
+        conn.execute("INSERT INTO job_execution_logs_unmigrated SELECT * FROM job_execution_logs WHERE timestamp IS NULL")
+        logging.warning(
+            f"{untimed} execution log(s) without a timestamp were moved to table job_execution_logs_unmigrated."
+        )
+    statuses = ", ".join(f"'{status}'" for status in JOB_STATUSES)
+    _rebuild_table(
+        conn,
+        "job_execution_logs",
+        f"""
+        CREATE TABLE {{table}} (
+            id INTEGER NOT NULL PRIMARY KEY,
+            job_id VARCHAR,
+            exit_code INTEGER,
+            execution_time FLOAT,
+            timestamp BIGINT NOT NULL,
+            status VARCHAR(7) NOT NULL CONSTRAINT job_status CHECK (status IN ({statuses})),
+            job_group VARCHAR,
+            queue_wait FLOAT
+        )
+        """,
+        # Rows logged before the status column existed were either successes or failures
+        """
+        SELECT id, job_id, exit_code, execution_time, to_epoch_us(timestamp),
+               COALESCE(status, CASE WHEN exit_code = 0 THEN 'success' ELSE 'failed' END),
+               job_group, queue_wait
+        FROM {table} WHERE timestamp IS NOT NULL
+        """,
+        (
+            "CREATE INDEX ix_job_execution_logs_job_id_timestamp ON job_execution_logs (job_id, timestamp)",
+            "CREATE INDEX ix_job_execution_logs_timestamp ON job_execution_logs (timestamp)",
+        ),
+    )
+
+
+def _main_epoch_timestamps(conn):
+    """
+    Store fingerprint and export bookmark timestamps as epoch microseconds.
+    """
+    _rebuild_table(
+        conn,
+        "job_input_fingerprints",
+        "CREATE TABLE {table} (job_id VARCHAR NOT NULL PRIMARY KEY, fingerprint VARCHAR, timestamp BIGINT)",
+        "SELECT job_id, fingerprint, to_epoch_us(timestamp) FROM {table}",
+    )
+    _rebuild_table(
+        conn,
+        "export_bookmarks",
+        "CREATE TABLE {table} (name VARCHAR NOT NULL PRIMARY KEY, last_timestamp BIGINT, updated_at BIGINT)",
+        "SELECT name, to_epoch_us(last_timestamp), to_epoch_us(updated_at) FROM {table}",
+    )
+
+
+# (version, migration) pairs, in order; versions are never reused or reordered
+MAIN_MIGRATIONS = [
+    (1, _main_epoch_timestamps),
+]
+HISTORY_MIGRATIONS = [
+    (1, _history_epoch_timestamps),
+]
+
+
+def _create_statements(metadata):
+    dialect = sqlite_dialect.dialect()
+    statements = []
+    for table in metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        statements.extend(str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes)
+    return statements
+
+
+def schema_version(conn):
+    """
+    Return the latest migration version applied to a database (0 if none).
+    """
+    if not _table_exists(conn, VERSION_TABLE):
+        return 0
+    return conn.execute(f"SELECT MAX(version) FROM {VERSION_TABLE}").fetchone()[0] or 0
+
+
+def upgrade(db_path, metadata, migrations):
+    """
+    Bring one database up to the latest version of `migrations`.
+
+    Returns the versions applied. A write lock is held throughout, so
+    concurrent processes upgrading the same file wait for each other.
+    """
+    latest = migrations[-1][0] if migrations else 0
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.create_function("to_epoch_us", 1, to_epoch_us, deterministic=True)
+    try:
+        # Cheap check first: most opens find the schema already current
+        if schema_version(conn) >= latest:
+            return []
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (version INTEGER NOT NULL PRIMARY KEY, description VARCHAR, applied_at BIGINT)"
+        )
+        current = schema_version(conn)
+        applied = []
+        tables = [name for name in metadata.tables if _table_exists(conn, name)]
+        if current == 0 and not tables:
+            for statement in _create_statements(metadata):
+                conn.execute(statement)
+            conn.execute(
+                f"INSERT INTO {VERSION_TABLE} VALUES (?, ?, ?)", (latest, "Initial schema", to_epoch_us(datetime.now()))
+            )
+        else:
+            for version, migration in migrations:
+                if version <= current:
+                    continue
+                description = migration.__doc__.strip().splitlines()[0]
+                logging.info(f"Migrating {db_path} to schema version {version}: {description}")
+                migration(conn)
+                conn.execute(
+                    f"INSERT INTO {VERSION_TABLE} VALUES (?, ?, ?)", (version, description, to_epoch_us(datetime.now()))
+                )
+                applied.append(version)
+        conn.execute("COMMIT")
+        return applied
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def upgrade_main_db(db_path):
+    return upgrade(db_path, Base.metadata, MAIN_MIGRATIONS)
+
+
+def upgrade_partition(partition_path):
+    return upgrade(partition_path, HistoryBase.metadata, HISTORY_MIGRATIONS)
+
+
+def migrate(db_path):
+    """
+    Upgrade the main database and every history partition on daemon start.
+    """
+    # Imported here because history opens partitions through this module
+    import history
+
+    upgrade_main_db(db_path)
+    upgraded = 0
+    for month in history.list_partitions(db_path):
+        if upgrade_partition(history.partition_path(db_path, month)):
+            upgraded += 1
+    if upgraded:
+        logging.info(f"Upgraded the schema of {upgraded} history partition(s).")
@@ -1,18 +1,71 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, BigInteger, Column, Enum, Index, Integer, String, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+# Timestamps are stored as integer microseconds since the Unix epoch
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+JOB_STATUSES = ("success", "failed", "skipped")
+
+# Tables of the main database (db_path)
 Base = declarative_base()
+# Tables of each monthly execution history partition (see history.py)
+HistoryBase = declarative_base()
 
-class JobExecutionLog(Base):
+class JobExecutionLog(HistoryBase):
     __tablename__ = "job_execution_logs"
+    __table_args__ = (
+        Index("ix_job_execution_logs_job_id_timestamp", "job_id", "timestamp"),
+        Index("ix_job_execution_logs_timestamp", "timestamp"),
+    )
     id = Column(Integer, primary_key=True)
     job_id = Column(String)
     exit_code = Column(Integer)
     execution_time = Column(Float)
-    timestamp = Column(DateTime)
+    timestamp = Column(BigInteger, nullable=False)  # epoch microseconds
+    status = Column(Enum(*JOB_STATUSES, name="job_status", create_constraint=True), nullable=False)
+    job_group = Column(String)
+    queue_wait = Column(Float)  # seconds spent in the dispatch queue
+
+class JobInputFingerprint(Base):
+    __tablename__ = "job_input_fingerprints"
+    job_id = Column(String, primary_key=True)
+    fingerprint = Column(String)
+    timestamp = Column(BigInteger)  # epoch microseconds
+
+class ExportBookmark(Base):
+    __tablename__ = "export_bookmarks"
+    name = Column(String, primary_key=True)
+    last_timestamp = Column(BigInteger)  # timestamp of the last exported row
+    updated_at = Column(BigInteger)
+
+def to_epoch_us(value):
+    """
+    Convert a naive local datetime or ISO timestamp string to epoch microseconds.
+
+    Integers are assumed to be epoch microseconds already; None is returned as is.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+def from_epoch_us(value):
+    """
+    Convert epoch microseconds back to a naive local datetime.
+    """
+    if value is None:
+        return None
+    return (EPOCH + timedelta(microseconds=value)).astimezone().replace(tzinfo=None)
 
 def init_db(db_path):
+    # Imported here because migrations builds its DDL from the models above
+    from migrations import upgrade_main_db
+
+    upgrade_main_db(db_path)
     engine = create_engine(f"sqlite:///{db_path}")
-    Base.metadata.create_all(engine)
     return sessionmaker(bind=engine)()
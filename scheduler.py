@@ -1,14 +1,17 @@
 import os
-import toml
 import logging
-import sqlite3
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 from subprocess import Popen, PIPE
-from models import init_db
 from condition_parser import evaluate_condition
+from config_compiler import build_trigger, compile_config
+from fingerprint import compute_fingerprint, input_spec, last_fingerprint, record_fingerprint
+import dispatch
+import history
+import migrations
+import tracing
 import web_ui
 from daemon import DaemonContext
 
@@ -17,6 +20,7 @@ from utils import get_valid_directory
 # Initialize logging
 logs_path = get_valid_directory()
 LOG_FILE = os.path.join(str(logs_path), "logs", "scheduler.log")
+TRACE_FILE = os.path.join(str(logs_path), "logs", "trace.jsonl")
 os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 logging.basicConfig(
     level=logging.INFO,
@@ -28,15 +32,25 @@ logging.basicConfig(
 # Global variables
 scheduler = BackgroundScheduler()
 CONFIG = {}
+TRIGGERS = {}
+CONFIG_ERRORS = []
+DISPATCHER = None
 
 # Load configuration
 def load_config(config_file="config.toml"):
     """
     Load the configuration file. Return a valid configuration or raise an error if not found.
+
+    Jobs are validated and their triggers built by the config compiler, whose
+    cached snapshot is reused while the file is unchanged. Invalid jobs are
+    recorded in CONFIG_ERRORS and left out of TRIGGERS.
     """
-    global CONFIG
+    global CONFIG, TRIGGERS, CONFIG_ERRORS
     if os.path.exists(config_file):
-        CONFIG = toml.load(config_file)
+        compiled = compile_config(config_file)
+        CONFIG, TRIGGERS, CONFIG_ERRORS = compiled.config, compiled.triggers, compiled.errors
+        for error in CONFIG_ERRORS:
+            logging.error(f"Configuration error: {error}")
 
         # Validate required keys in the configuration
         if "settings" not in CONFIG:
@@ -46,6 +60,8 @@ def load_config(config_file="config.toml"):
         if "db_path" not in CONFIG["settings"]:
             CONFIG["settings"]["db_path"] = "jobs.db"
 
+        tracing.configure(CONFIG["settings"], TRACE_FILE)
+
         return CONFIG
     else:
         raise FileNotFoundError(f"Configuration file '{config_file}' not found.")
@@ -70,46 +86,92 @@ def remove_pid(pid_file):
 
 
 # Job Execution
-def run_job(job_id, interpreter, command, env_file=None):
+def load_env(env_file=None):
     """
-    Execute the job's command and log its output, exit code, and execution time.
+    Build the job environment from os.environ plus the optional env file.
     """
-    start_time = datetime.now()
-
-    # Load environment variables from env_file
     env = os.environ.copy()
     if env_file and os.path.exists(env_file):
         with open(env_file) as f:
             env.update(
                 dict(line.strip().split("=", 1) for line in f if line.strip() and not line.startswith("#"))
             )
+    return env
+
+def check_inputs(job_id, inputs, env, interpreter=None, command=None, env_file=None):
+    """
+    Fingerprint a job's declared inputs and its command.
+
+    Return the fingerprint and whether it matches the one stored by the job's
+    last successful run.
+    """
+    fingerprint = compute_fingerprint(inputs, env, interpreter, command, env_file)
+    return fingerprint, fingerprint == last_fingerprint(CONFIG["settings"]["db_path"], job_id)
+
+def record_inputs(job_id, fingerprint, success):
+    """
+    Remember the input fingerprint of a successful run; forget it after a failure.
+    """
+    record_fingerprint(CONFIG["settings"]["db_path"], job_id, fingerprint, success)
+
+def log_skipped_run(job_id, start_time, group=None, queue_wait=None):
+    """
+    Record a run skipped because its inputs are unchanged.
+    """
+    execution_time = (datetime.now() - start_time).total_seconds()
+    log_to_db(job_id, None, execution_time, status="skipped", group=group, queue_wait=queue_wait)
+    logging.info(f"Skipping job {job_id} because its inputs are unchanged since its last successful run.")
+
+def run_job(job_id, interpreter, command, env_file=None, inputs=None, group=None, queue_wait=None):
+    """
+    Execute the job's command and log its output, exit code, and execution time.
+
+    Jobs declaring `inputs` are skipped when their input fingerprint is unchanged.
+    `queue_wait` is the time the run spent in the dispatch queue, if any.
+    """
+    with tracing.trace("run_job", job_id=job_id, group=group or "", queue_wait=queue_wait or 0.0) as run_span:
+        start_time = datetime.now()
+
+        # Load environment variables from env_file
+        with tracing.span("run_job.load_env"):
+            env = load_env(env_file)
 
-    # Execute the command
-    process = Popen([interpreter, "-c", command], stdout=PIPE, stderr=PIPE, env=env)
-    stdout, stderr = process.communicate()
-    exit_code = process.returncode
+        fingerprint = None
+        if inputs:
+            with tracing.span("run_job.fingerprint"):
+                fingerprint, unchanged = check_inputs(job_id, inputs, env, interpreter, command, env_file)
+            if unchanged:
+                run_span.set_attribute("status", "skipped")
+                log_skipped_run(job_id, start_time, group, queue_wait)
+                return
 
-    # Log execution details
-    end_time = datetime.now()
-    execution_time = (end_time - start_time).total_seconds()
-    log_to_db(job_id, exit_code, execution_time)
-    log_to_file(job_id, exit_code, execution_time, stdout, stderr)
+        # Execute the command
+        with tracing.span("run_job.spawn", interpreter=interpreter):
+            process = Popen([interpreter, "-c", command], stdout=PIPE, stderr=PIPE, env=env)
+        with tracing.span("run_job.communicate", pid=process.pid):
+            stdout, stderr = process.communicate()
+        exit_code = process.returncode
+        run_span.set_attribute("exit_code", exit_code)
 
-def log_to_db(job_id, exit_code, execution_time):
+        # Log execution details
+        end_time = datetime.now()
+        execution_time = (end_time - start_time).total_seconds()
+        with tracing.span("run_job.log_to_db"):
+            log_to_db(job_id, exit_code, execution_time, group=group, queue_wait=queue_wait)
+        with tracing.span("run_job.log_to_file"):
+            log_to_file(job_id, exit_code, execution_time, stdout, stderr)
+        if fingerprint:
+            record_inputs(job_id, fingerprint, exit_code == 0)
+
+def log_to_db(job_id, exit_code, execution_time, status=None, group=None, queue_wait=None):
     """
     Log job execution details to SQLite database.
     """
-    conn = sqlite3.connect(CONFIG["settings"]["db_path"])
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO job_execution_logs (job_id, exit_code, execution_time, timestamp)
-        VALUES (?, ?, ?, ?)
-        """,
-        (job_id, exit_code, execution_time, datetime.now()),
+    if status is None:
+        status = "success" if exit_code == 0 else "failed"
+    history.insert_log(
+        CONFIG["settings"]["db_path"], job_id, exit_code, execution_time, status, group=group, queue_wait=queue_wait
     )
-    conn.commit()
-    conn.close()
 
 def log_to_file(job_id, exit_code, execution_time, stdout, stderr):
     """
@@ -127,35 +189,73 @@ def schedule_jobs(jobs):
     """
     Add jobs to the APScheduler based on their configuration.
     """
-    for job_id, job in jobs.items():
-        interpreter = CONFIG["interpreters"].get(job["type"], "")
-        if not interpreter:
-            logging.warning(f"Interpreter for job {job_id} not found.")
-            continue
-
-        # Check for conditions
-        condition = job.get("condition")
-        if condition:
-            condition_met = evaluate_condition(
-                condition, CONFIG["settings"]["db_path"], job_id
-            )
-            if not condition_met:
-                logging.info(f"Skipping job {job_id} because its condition is not met.")
+    if CONFIG["settings"].get("engine", "thread") == "asyncio":
+        from async_engine import run_job_async as job_func
+    else:
+        job_func = run_job
+    if DISPATCHER is not None:
+        submit = DISPATCHER.submit_async if isinstance(DISPATCHER, dispatch.AsyncDispatcher) else DISPATCHER.submit
+
+    with tracing.trace("schedule_jobs", job_count=len(jobs)):
+        for job_id, job in jobs.items():
+            interpreter = CONFIG["interpreters"].get(job["type"], "")
+            if not interpreter:
+                logging.warning(f"Interpreter for job {job_id} not found.")
                 continue
 
-        # Determine schedule
-        schedule_type = job.get("schedule_type", "cron")
-        if schedule_type == "cron":
-            trigger = CronTrigger.from_crontab(job["schedule"])
-        else:
-            trigger = IntervalTrigger(seconds=job["interval_seconds"])
+            # Check for conditions
+            condition = job.get("condition")
+            if condition:
+                with tracing.span("schedule_jobs.evaluate_condition", job_id=job_id):
+                    condition_met = evaluate_condition(
+                        condition, CONFIG["settings"]["db_path"], job_id
+                    )
+                if not condition_met:
+                    logging.info(f"Skipping job {job_id} because its condition is not met.")
+                    continue
 
+            # Triggers are prebuilt by the config compiler
+            trigger = TRIGGERS.get(job_id)
+            if trigger is None:
+                logging.warning(f"Skipping job {job_id} because its configuration is invalid.")
+                continue
+            if isinstance(trigger, IntervalTrigger):
+                # Interval phase starts when the job is scheduled, not when the snapshot was compiled
+                trigger = build_trigger(job)
+
+            job_args = [job_id, interpreter, job["command"], job.get("env_file"), input_spec(job)]
+            group = job.get("group", dispatch.DEFAULT_GROUP)
+            if DISPATCHER is not None:
+                # Triggers only enqueue the run; the dispatcher decides when it starts
+                func = submit
+                args = [job_id, group, job.get("priority", 0), job_func, job_args, {"group": group}]
+                kwargs = {}
+            else:
+                func, args, kwargs = job_func, job_args, {"group": group}
+
+            with tracing.span("schedule_jobs.add_job", job_id=job_id):
+                scheduler.add_job(
+                    func=func,
+                    args=args,
+                    kwargs=kwargs,
+                    trigger=trigger,
+                    id=job_id,
+                    name=job.get("name", f"Job {job_id}"),
+                    replace_existing=True,
+                )
+
+def schedule_history_retention():
+    """
+    Expire history partitions older than `history_retention_months` at the start of each month.
+    """
+    keep_months = CONFIG["settings"].get("history_retention_months", 0)
+    if keep_months > 0:
         scheduler.add_job(
-            func=run_job,
-            args=[job_id, interpreter, job["command"], job.get("env_file")],
-            trigger=trigger,
-            id=job_id,
-            name=job.get("name", f"Job {job_id}"),
+            func=history.expire_partitions,
+            args=[CONFIG["settings"]["db_path"], keep_months],
+            trigger=CronTrigger(day=1, hour=0, minute=5),
+            id="_history_retention",
+            name="Expire execution history partitions",
             replace_existing=True,
         )
 
@@ -165,37 +265,47 @@ def start_daemon(daemonize=False):
     """
     global CONFIG
 
-    init_db(CONFIG["settings"]["db_path"])
-    schedule_jobs(CONFIG["jobs"])
+    migrations.migrate(CONFIG["settings"]["db_path"])
+    history.init_history(CONFIG["settings"]["db_path"], CONFIG["settings"].get("history_retention_months", 0))
 
     # Get the PID file path from config
     pid_file = CONFIG["settings"].get("pid_file", "/tmp/avscheduler.pid")
 
-    # Start the Flask web interface
-    web_host = CONFIG["web_server"].get("host", "127.0.0.1")
-    web_port = CONFIG["web_server"].get("port", 5000)
-
-    def start_flask():
-        web_ui.app.run(host=web_host, port=web_port, debug=False)
-
     if daemonize:
         # Daemonize using python-daemon or custom method
         with DaemonContext():
-            write_pid(pid_file)
-            flask_thread = start_flask_in_thread()
-            try:
-                scheduler.start()
-                flask_thread.join()
-            finally:
-                remove_pid(pid_file)
+            run_scheduler(pid_file)
     else:
-        write_pid(pid_file)
-        flask_thread = start_flask_in_thread()
-        try:
+        run_scheduler(pid_file)
+
+def run_scheduler(pid_file):
+    """
+    Schedule the configured jobs and block until the scheduler stops.
+
+    With `engine = "asyncio"` the scheduler and its event loop are created
+    here, after daemonizing, because DaemonContext closes inherited descriptors.
+    """
+    global scheduler, DISPATCHER
+
+    write_pid(pid_file)
+    try:
+        engine = CONFIG["settings"].get("engine", "thread")
+        DISPATCHER = dispatch.create_dispatcher(CONFIG, engine)
+        if engine == "asyncio":
+            import async_engine
+            scheduler = async_engine.create_scheduler()
+            schedule_jobs(CONFIG["jobs"])
+            schedule_history_retention()
+            start_flask_in_thread()
+            async_engine.run_forever(scheduler)
+        else:
+            schedule_jobs(CONFIG["jobs"])
+            schedule_history_retention()
+            flask_thread = start_flask_in_thread()
             scheduler.start()
             flask_thread.join()
-        finally:
-            remove_pid(pid_file)
+    finally:
+        remove_pid(pid_file)
 
 def start_flask_in_thread():
     """
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# scheduler and web_ui read config.toml from AVSCHEDULER_DIR at import time,
+# so point it at a throwaway directory before any test imports them
+_test_dir = tempfile.mkdtemp(prefix="avscheduler-tests-")
+with open(os.path.join(_test_dir, "config.toml"), "w") as f:
+    f.write(f'[settings]\ndb_path = "{os.path.join(_test_dir, "jobs.db")}"\n\n[jobs]\n')
+os.environ["AVSCHEDULER_DIR"] = _test_dir
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,61 @@
+import asyncio
+import resource
+import sys
+
+import pytest
+
+import async_engine
+import history
+import scheduler
+from models import init_db
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.db")
+    monkeypatch.setitem(scheduler.CONFIG, "settings", {"db_path": path})
+    init_db(path)
+    return path
+
+
+@pytest.fixture
+def loop():
+    async_engine.create_scheduler()
+    loop = asyncio.get_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.mark.parametrize("command, exit_code, status", [("print('ok')", 0, "success"), ("raise SystemExit(3)", 3, "failed")])
+def test_run_job_async_runs_subprocess_and_logs_it(db_path, loop, command, exit_code, status):
+    loop.run_until_complete(async_engine.run_job_async("job", sys.executable, command))
+
+    assert history.latest_log(db_path, "job", ("exit_code", "status")) == (exit_code, status)
+
+
+@pytest.fixture
+def low_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(1024, hard), hard))
+    yield
+    resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_hundreds_of_concurrent_jobs_under_default_fd_limit(db_path, low_fd_limit):
+    async_engine.create_scheduler()
+    loop = asyncio.get_event_loop()
+    job_ids = [f"job-{i}" for i in range(400)]
+
+    async def run_all():
+        await asyncio.gather(
+            *(async_engine.run_job_async(job_id, sys.executable, "import time; time.sleep(0.5)") for job_id in job_ids)
+        )
+
+    try:
+        loop.run_until_complete(run_all())
+    finally:
+        loop.close()
+
+    latest = history.latest_logs(db_path, job_ids)
+    assert len(latest) == len(job_ids)
+    assert {exit_code for _, exit_code, _ in latest.values()} == {0}
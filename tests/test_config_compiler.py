@@ -0,0 +1,54 @@
+import pickle
+
+import config_compiler
+
+CONFIG = """
+[interpreters]
+python = "python3"
+
+[jobs.report]
+type = "python"
+command = "print(1)"
+schedule = "0 * * * *"
+"""
+
+
+def _config_file(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text(CONFIG)
+    return str(path)
+
+
+def test_unreadable_snapshot_is_a_cache_miss(tmp_path):
+    config_file = _config_file(tmp_path)
+    config_compiler.compile_config(config_file)
+    snapshot = config_compiler.snapshot_path(config_file)
+
+    # Keep the valid header, replace the body with a pickle from a future protocol
+    with open(snapshot, "rb") as f:
+        header = pickle.load(f)
+    with open(snapshot, "wb") as f:
+        pickle.dump(header, f)
+        f.write(b"\x80\x09")
+
+    compiled = config_compiler.compile_config(config_file)
+
+    assert list(compiled.triggers) == ["report"]
+
+
+def test_snapshot_is_rebuilt_when_local_timezone_changes(tmp_path, monkeypatch):
+    config_file = _config_file(tmp_path)
+    monkeypatch.setattr(config_compiler, "_local_timezone", lambda: "Europe/Berlin")
+    config_compiler.compile_config(config_file)
+
+    monkeypatch.setattr(config_compiler, "_local_timezone", lambda: "America/New_York")
+    parse_toml, read = config_compiler._parse_toml, []
+
+    def recording_parse(data):
+        read.append(data)
+        return parse_toml(data)
+
+    monkeypatch.setattr(config_compiler, "_parse_toml", recording_parse)
+    config_compiler.compile_config(config_file)
+
+    assert read, "a snapshot compiled in another timezone must not be reused"
@@ -0,0 +1,115 @@
+import copy
+
+import pytest
+
+import dispatch
+from config_compiler import validate_config
+
+
+@pytest.mark.parametrize(
+    "settings, error",
+    [
+        ({"queue_aging_seconds": 0}, "'queue_aging_seconds' must be a positive number"),
+        ({"queue_aging_seconds": "60"}, "'queue_aging_seconds' must be a positive number"),
+        ({"max_concurrent_jobs": -1}, "'max_concurrent_jobs' must be a non-negative integer"),
+        ({"max_concurrent_jobs": 2.5}, "'max_concurrent_jobs' must be a non-negative integer"),
+    ],
+)
+def test_invalid_dispatch_settings_are_reported_and_defaulted_by_dispatcher(settings, error):
+    config = {"settings": {"max_concurrent_jobs": 2, **settings}, "groups": {"batch": {"weight": 0}}}
+
+    original = copy.deepcopy(config)
+    compiled = validate_config(config)
+
+    # The config is written back by add-job and friends, so it must be untouched
+    assert config == original
+    assert f"settings: {error}" in compiled.errors
+    assert "groups.batch: 'weight' must be a positive number" in compiled.errors
+    dispatcher = dispatch.create_dispatcher(compiled.config)
+    assert dispatcher is None or (dispatcher.aging_seconds > 0 and dispatcher.weights == {"batch": 1.0})
+
+
+def test_dispatch_queue_rejects_non_positive_aging():
+    with pytest.raises(ValueError):
+        dispatch.DispatchQueue(1, None, 0)
+
+
+class RecordingQueue(dispatch.DispatchQueue):
+    """
+    Records started runs instead of executing them; `finish_next` frees a slot.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = []
+        self._unfinished = []
+
+    def _start(self, pending, queue_wait):
+        self.started.append(pending.job_id)
+        self._unfinished.append(pending)
+
+    def finish_next(self):
+        self._finish(self._unfinished.pop(0))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(dispatch.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _submit(queue, job_id, group="default", priority=0):
+    return queue.submit(job_id, group, priority, None, ())
+
+
+def test_groups_share_slots_by_weight(clock):
+    queue = RecordingQueue(1, {"heavy": 5, "light": 1})
+    for i in range(30):
+        _submit(queue, f"heavy-{i}", "heavy")
+        _submit(queue, f"light-{i}", "light")
+
+    for _ in range(35):
+        queue.finish_next()
+
+    groups = [job_id.split("-")[0] for job_id in queue.started[:36]]
+    assert groups.count("heavy") == 30 and groups.count("light") == 6
+
+
+def test_higher_priority_runs_first_within_a_group(clock):
+    queue = RecordingQueue(1, aging_seconds=1e9)
+    _submit(queue, "blocker")
+    _submit(queue, "low", priority=1)
+    _submit(queue, "high", priority=10)
+    _submit(queue, "mid", priority=5)
+
+    for _ in range(3):
+        queue.finish_next()
+
+    assert queue.started == ["blocker", "high", "mid", "low"]
+
+
+def test_aged_low_priority_run_overtakes_newer_high_priority_run(clock):
+    queue = RecordingQueue(1, aging_seconds=10)
+    _submit(queue, "blocker")
+    _submit(queue, "old-low", priority=0)
+    clock[0] = 30.0  # old-low has aged three priority levels
+    _submit(queue, "new-high", priority=2)
+    _submit(queue, "new-top", priority=5)
+
+    for _ in range(3):
+        queue.finish_next()
+
+    assert queue.started == ["blocker", "new-top", "old-low", "new-high"]
+
+
+def test_job_already_queued_or_running_is_not_queued_again(clock):
+    queue = RecordingQueue(1)
+    assert _submit(queue, "a")
+    assert _submit(queue, "b")
+    assert not _submit(queue, "a")  # running
+    assert not _submit(queue, "b")  # queued
+
+    queue.finish_next()
+    assert _submit(queue, "a")
+    assert queue.pending() == {"default": 1}
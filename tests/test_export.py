@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import export
+import history
+
+
+def test_incremental_export_holds_back_recent_rows(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    now = datetime.now()
+    history.insert_log(db_path, "a", 0, 1.0, "success", timestamp=now - timedelta(minutes=5))
+    history.insert_log(db_path, "a", 0, 1.0, "success", timestamp=now)
+
+    assert sum(map(len, export.iter_chunks(db_path, bookmark="nightly"))) == 1
+
+    # A writer that took its timestamp earlier commits after the first export
+    history.insert_log(db_path, "b", 0, 1.0, "success", timestamp=now - timedelta(seconds=1))
+    history.insert_log(db_path, "a", 0, 1.0, "success", timestamp=now - timedelta(minutes=3))
+
+    assert [row[1] for chunk in export.iter_chunks(db_path, bookmark="nightly") for row in chunk] == ["a"]
+
+
+def test_web_export_advances_bookmark_only_on_post(tmp_path, monkeypatch):
+    import web_ui
+
+    db_path = str(tmp_path / "jobs.db")
+    monkeypatch.setattr(web_ui, "DB_PATH", db_path)
+    history.insert_log(db_path, "a", 0, 1.0, "success", timestamp=datetime.now() - timedelta(minutes=5))
+    client = web_ui.app.test_client()
+
+    for _ in range(2):
+        assert client.get("/export?format=jsonl&incremental=web").data.count(b"\n") == 1
+    assert client.post("/export", data={"format": "jsonl", "incremental": "web"}).data.count(b"\n") == 1
+    assert client.get("/export?format=jsonl&incremental=web").data == b""
+
+
+def test_export_rows_are_keyed_by_partition_and_id(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    history.insert_log(db_path, "a", 0, 1.0, "success", timestamp=datetime(2026, 9, 30, 12))
+    history.insert_log(db_path, "a", 0, 1.0, "success", timestamp=datetime(2026, 10, 1, 12))
+
+    lines = "".join(export.encode_csv(export.iter_chunks(db_path))).splitlines()
+
+    assert lines[0].startswith("partition,id,")
+    assert [line.split(",")[:2] for line in lines[1:]] == [["2026-09", "1"], ["2026-10", "1"]]
+
+
+def test_export_command_rejects_non_positive_chunk_size():
+    from click.testing import CliRunner
+
+    import cli
+
+    for value in ("0", "-1"):
+        result = CliRunner().invoke(cli.export, ["--chunk-size", value])
+        assert result.exit_code == 2
+        assert "is not in the range x>=1" in result.output
+
+
+def test_invalid_export_bounds_are_rejected_before_streaming(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    import cli
+    import web_ui
+
+    result = CliRunner().invoke(cli.export, ["--since", "yesterday"])
+    assert result.exit_code == 2
+    assert "'yesterday' is not a timestamp" in result.output
+
+    monkeypatch.setattr(web_ui, "DB_PATH", str(tmp_path / "jobs.db"))
+    response = web_ui.app.test_client().get("/export?format=csv&until=soon")
+    assert response.status_code == 400
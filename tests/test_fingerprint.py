@@ -0,0 +1,19 @@
+from fingerprint import compute_fingerprint
+
+
+def test_fingerprint_changes_with_the_job_definition(tmp_path):
+    (tmp_path / "data.csv").write_text("a,b\n")
+    env_file = tmp_path / "job.env"
+    env_file.write_text("MODE=full\n")
+    spec = {"globs": [str(tmp_path / "*.csv")], "env": [], "hash": False}
+
+    def fingerprint(interpreter="python3", command="print(1)"):
+        return compute_fingerprint(spec, {}, interpreter, command, str(env_file))
+
+    baseline = fingerprint()
+    assert fingerprint() == baseline
+    assert fingerprint(command="print(2)") != baseline
+    assert fingerprint(interpreter="python3.12") != baseline
+
+    env_file.write_text("MODE=incremental\n")
+    assert fingerprint() != baseline
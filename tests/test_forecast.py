@@ -0,0 +1,19 @@
+import pytest
+from click.testing import CliRunner
+
+import cli
+import forecast
+
+
+@pytest.mark.parametrize("option", ["--window", "--top"])
+@pytest.mark.parametrize("value", ["0", "-3"])
+def test_forecast_command_rejects_non_positive_sizes(option, value):
+    result = CliRunner().invoke(cli.forecast, [option, value])
+
+    assert result.exit_code == 2
+    assert "is not in the range x>=1" in result.output
+
+
+def test_forecast_rejects_empty_window():
+    with pytest.raises(ValueError):
+        forecast.forecast({}, {}, {}, window=0)
@@ -0,0 +1,77 @@
+import sqlite3
+from datetime import datetime
+
+import history
+
+
+def _legacy_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE job_execution_logs (id INTEGER PRIMARY KEY, job_id VARCHAR, exit_code INTEGER, execution_time FLOAT, timestamp DATETIME)"
+    )
+    conn.executemany(
+        "INSERT INTO job_execution_logs (job_id, exit_code, execution_time, timestamp) VALUES (?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_migrate_legacy_logs_keeps_rows_without_timestamp(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    _legacy_db(db_path, [("a", 0, 1.0, "2026-08-01 10:00:00"), ("a", 1, 1.0, "2026-09-01 10:00:00"), ("b", 0, 1.0, None)])
+
+    history.migrate_legacy_logs(db_path)
+
+    assert len(list(history.iter_logs(db_path))) == 2
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT job_id FROM job_execution_logs_unmigrated").fetchall() == [("b",)]
+    conn.close()
+
+
+def test_migrate_legacy_logs_resumes_without_duplicates(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "jobs.db")
+    _legacy_db(db_path, [("a", 0, 1.0, "2026-08-01 10:00:00"), ("a", 0, 1.0, "2026-09-01 10:00:00")])
+
+    # Simulate a crash after the first month has been moved
+    ensure_partition = history._ensure_partition
+    calls = []
+
+    def crash_on_second_month(db, month):
+        calls.append(month)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return ensure_partition(db, month)
+
+    monkeypatch.setattr(history, "_ensure_partition", crash_on_second_month)
+    try:
+        history.migrate_legacy_logs(db_path)
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.setattr(history, "_ensure_partition", ensure_partition)
+
+    history.migrate_legacy_logs(db_path)
+
+    assert sorted(row[1] for row in history.iter_logs(db_path, columns=("job_id", "timestamp"))) == sorted(
+        [history.to_epoch_us("2026-08-01 10:00:00"), history.to_epoch_us("2026-09-01 10:00:00")]
+    )
+
+
+def test_average_durations_ignore_skipped_runs(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    history.insert_log(db_path, "a", 0, 10.0, "success")
+    history.insert_log(db_path, "a", None, 0.001, "skipped")
+    history.insert_log(db_path, "b", None, 0.001, "skipped")
+
+    assert history.average_durations(db_path) == {"a": 10.0}
+
+
+def test_expire_partitions_counts_calendar_months_from_today(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    for month in ("2024-01", "2025-01", "2026-08", "2026-10"):
+        history.insert_log(db_path, "a", 0, 1.0, "success", timestamp=f"{month}-15 12:00:00")
+
+    # Run on the 1st of November, before that month's partition exists
+    expired = history.expire_partitions(db_path, 3, today=datetime(2026, 11, 1, 0, 5))
+
+    assert sorted(expired) == ["2024-01", "2025-01", "2026-08"]
+    assert history.list_partitions(db_path) == ["2026-10"]
@@ -0,0 +1,25 @@
+import sqlite3
+
+import migrations
+
+
+def test_history_migration_sets_aside_rows_without_timestamp(tmp_path):
+    path = str(tmp_path / "2026-09.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE job_execution_logs (id INTEGER NOT NULL PRIMARY KEY, job_id VARCHAR, exit_code INTEGER, execution_time FLOAT, timestamp DATETIME, status VARCHAR)"
+    )
+    conn.executemany(
+        "INSERT INTO job_execution_logs (job_id, exit_code, execution_time, timestamp, status) VALUES (?, ?, ?, ?, ?)",
+        [("a", 0, 1.0, "2026-09-01 10:00:00", None), ("b", 1, 1.0, None, "failed")],
+    )
+    conn.commit()
+    conn.close()
+
+    assert migrations.upgrade_partition(path) == [1]
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT job_id, status FROM job_execution_logs").fetchall() == [("a", "success")]
+    assert conn.execute("SELECT job_id FROM job_execution_logs_unmigrated").fetchall() == [("b",)]
+    assert migrations.schema_version(conn) == 1
+    conn.close()
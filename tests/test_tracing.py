@@ -0,0 +1,35 @@
+import json
+
+import tracing
+
+
+def test_each_trace_is_written_as_an_otlp_export_request(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracing.configure({"trace_sample_rate": 1.0, "trace_file": str(path)}, None)
+    try:
+        for job_id in ("a", "b"):
+            with tracing.trace("run_job", job_id=job_id):
+                with tracing.span("run_job.spawn"):
+                    pass
+    finally:
+        tracing.configure({}, None)
+
+    requests = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(requests) == 2
+    resource_spans = requests[0]["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "avscheduler"}}]
+    spans = resource_spans["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["run_job.spawn", "run_job"]
+    assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+    assert spans[0]["traceId"] == spans[1]["traceId"]
+
+
+def test_invalid_sample_rate_is_reported_and_disables_tracing():
+    from config_compiler import validate_config
+
+    settings = {"trace_sample_rate": "high"}
+    compiled = validate_config({"settings": settings})
+
+    assert "settings: 'trace_sample_rate' must be a number between 0.0 and 1.0" in compiled.errors
+    tracing.configure(settings, "unused.jsonl")
+    assert tracing.trace("run_job") is tracing._NOOP_SPAN
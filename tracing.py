@@ -0,0 +1,254 @@
+"""
+Lightweight span tracing for the scheduler hot path.
+
+Spans are recorded only when a sampled trace is active in the current context
+(thread or asyncio task). When tracing is disabled (the default) `trace()` and
+`span()` return a shared no-op object, so instrumented code pays a single
+global lookup per call.
+
+Spans of a trace are collected until its root span ends, then written by
+`JsonLinesExporter` as one line holding a complete OTLP/JSON trace export
+request (`{"resourceSpans": [...]}`), the format read by OpenTelemetry
+tooling such as the collector's `otlpjsonfile` receiver.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+_exporter = None
+_sample_rate = 0.0
+_current_span = contextvars.ContextVar("avscheduler_current_span", default=None)
+
+SERVICE_NAME = "avscheduler"
+
+
+class _NoopSpan:
+    """
+    Stand-in returned when a span is not recorded.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _TraceBuffer:
+    """
+    Finished spans of one trace, held until its root span ends.
+    """
+
+    __slots__ = ("spans", "exported")
+
+    def __init__(self):
+        self.spans = []
+        self.exported = False
+
+
+class Span:
+    """
+    A single timed operation within a trace.
+    """
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns", "error", "_token", "_trace"
+    )
+
+    def __init__(self, name, trace_id, parent_id, attributes, trace=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error = None
+        self._token = None
+        self._trace = trace or _TraceBuffer()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        trace = self._trace
+        trace.spans.append(self)
+        if self.parent_id is None or trace.exported:
+            # The root ended (or this span outlived it): export what was collected
+            spans, trace.spans = trace.spans, []
+            trace.exported = True
+            exporter = _exporter
+            if exporter is not None:
+                exporter.export(spans)
+        return False
+
+    def to_dict(self):
+        """
+        Encode the span following the OTLP/JSON field layout.
+        """
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _encode_value(value)} for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+
+
+def export_request(spans):
+    """
+    Wrap spans in an OTLP/JSON `ExportTraceServiceRequest`.
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_dict() for span in spans]}],
+            }
+        ]
+    }
+
+
+class JsonLinesExporter:
+    """
+    Append finished traces to a local JSON-lines file.
+
+    `export` only queues the spans; a background thread encodes and writes
+    them in batches through a single open file handle, so neither worker
+    threads nor the asyncio event loop wait on the disk. The thread and file
+    are created on first export in each process, since daemonizing forks and
+    closes inherited descriptors.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._queue = None
+        self._writer = None
+
+    def export(self, spans):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start_writer()
+        self._queue.put(spans)
+
+    def close(self):
+        """
+        Write the queued traces and close the file.
+        """
+        with self._lock:
+            if self._pid == os.getpid() and self._writer.is_alive():
+                self._queue.put(None)
+                self._writer.join()
+            self._pid = None
+        atexit.unregister(self.close)
+
+    def _start_writer(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "a")
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="avscheduler-trace-writer", daemon=True)
+        self._writer.start()
+        self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is waiting, then write it in one go
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = [json.dumps(export_request(spans), separators=(",", ":")) + "\n" for spans in batch if spans]
+            self._file.write("".join(lines))
+            self._file.flush()
+            if stop:
+                self._file.close()
+                return
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def configure(settings, default_path):
+    """
+    Enable or disable tracing from the `[settings]` table.
+
+    `trace_sample_rate` is the fraction (0.0 - 1.0) of traces to record and
+    `trace_file` the JSON-lines output path (defaults to `default_path`).
+    Invalid values, already reported by the config compiler, disable tracing.
+    """
+    global _exporter, _sample_rate
+    rate = settings.get("trace_sample_rate", 0.0)
+    if isinstance(rate, bool) or not isinstance(rate, (int, float)):
+        rate = 0.0
+    _sample_rate = min(max(float(rate), 0.0), 1.0)
+    path = settings.get("trace_file", default_path) if _sample_rate > 0.0 else None
+    if not isinstance(path, str):
+        path = None
+    if _exporter is not None and _exporter.path == path:
+        return
+    previous, _exporter = _exporter, JsonLinesExporter(path) if path else None
+    if previous is not None:
+        previous.close()
+
+
+def trace(name, **attributes):
+    """
+    Start a new root span, subject to the configured sampling rate.
+    """
+    if _exporter is None or random.random() >= _sample_rate:
+        return _NOOP_SPAN
+    return Span(name, os.urandom(16).hex(), None, attributes)
+
+
+def span(name, **attributes):
+    """
+    Start a child span of the active span. No-op outside a sampled trace.
+    """
+    if _exporter is None:
+        return _NOOP_SPAN
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, attributes, parent._trace)
@@ -1,9 +1,13 @@
 import os
-import sqlite3
-import toml
+import tempfile
 
-from flask import Flask, render_template, redirect
+from flask import Flask, Response, abort, render_template, redirect, request, send_file, stream_with_context
 
+import export as export_module
+import forecast as forecast_module
+import history
+from config_compiler import compile_config
+from models import from_epoch_us, to_epoch_us
 from utils import get_valid_directory
 
 scheduler = None
@@ -19,33 +23,16 @@ def get_scheduler_instance():
 
 
 app = Flask(__name__)
-CONFIG = toml.load(CONFIG_FILE)
+CONFIG = compile_config(CONFIG_FILE).config
 DB_PATH = CONFIG["settings"]["db_path"]
 
 @app.route("/")
 def index():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
     # Fetch jobs and their latest logs
-    cursor.execute("SELECT DISTINCT job_id FROM job_execution_logs")
     jobs = []
-    for row in cursor.fetchall():
-        job_id = row[0]
-        cursor.execute(
-            """
-            SELECT timestamp, exit_code, execution_time
-            FROM job_execution_logs
-            WHERE job_id = ?
-            ORDER BY timestamp DESC
-            LIMIT 1
-            """,
-            (job_id,),
-        )
-        log = cursor.fetchone()
-        last_execution = log[0] if log else "N/A"
-        last_exit_code = log[1] if log else "N/A"
-        last_execution_time = log[2] if log else "N/A"
+    # Limiting the lookup to configured jobs lets it stop at the newest partitions
+    for job_id, log in sorted(history.latest_logs(DB_PATH, CONFIG.get("jobs", {}).keys()).items()):
+        last_execution, last_exit_code, last_execution_time = log
 
         # Fetch the next execution time from APScheduler
         apscheduler_job = get_scheduler_instance().get_job(job_id)
@@ -53,46 +40,99 @@ def index():
 
         jobs.append({
             "id": job_id,
-            "last_execution": last_execution,
+            "last_execution": from_epoch_us(last_execution),
             "last_exit_code": last_exit_code,
             "last_execution_time": last_execution_time,
             "next_execution": next_execution,
             "condition": CONFIG["jobs"].get(job_id, {}).get("condition", "N/A"),
         })
-    conn.close()
 
     return render_template("index.html", jobs=jobs)
 
 
 @app.route("/job/<job_id>")
 def job_details(job_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
     # Fetch execution logs for the selected job
-    cursor.execute(
-        """
-        SELECT timestamp, exit_code, execution_time
-        FROM job_execution_logs
-        WHERE job_id = ?
-        ORDER BY timestamp DESC
-        """,
-        (job_id,),
-    )
-    logs = cursor.fetchall()
-    conn.close()
+    logs = [
+        (from_epoch_us(timestamp), *rest)
+        for timestamp, *rest in history.iter_logs(DB_PATH, job_id=job_id, columns=("timestamp", "exit_code", "execution_time", "status"))
+    ]
 
     return render_template("job_details.html", job_id=job_id, logs=logs)
 
 
 
+@app.route("/forecast")
+def forecast():
+    horizon = request.args.get("horizon", "day")
+    if horizon not in forecast_module.HORIZONS:
+        horizon = "day"
+
+    compiled = compile_config(CONFIG_FILE)
+    durations = history.average_durations(DB_PATH)
+    result = forecast_module.forecast(compiled.config.get("jobs", {}), compiled.triggers, durations, horizon=horizon)
+    scale = max(result["load"], default=0.0) or 1.0
+
+    return render_template(
+        "forecast.html",
+        horizon=horizon,
+        horizons=sorted(forecast_module.HORIZONS),
+        result=result,
+        rows=forecast_module.heatmap_rows(result),
+        scale=scale,
+    )
+
+
+@app.route("/export", methods=["GET", "POST"])
+def export():
+    # A GET with `incremental` only previews the rows; advancing the bookmark
+    # changes server state, so it takes a POST (prefetchers and retries use GET)
+    fmt = request.values.get("format", "csv")
+    if fmt not in export_module.FORMATS:
+        abort(400, f"Unsupported format '{fmt}'.")
+
+    # Parse bounds before streaming starts, while a 400 can still be returned
+    bounds = {}
+    for name in ("since", "until"):
+        value = request.values.get(name) or None
+        try:
+            bounds[name] = to_epoch_us(value)
+        except ValueError:
+            abort(400, f"Invalid '{name}' timestamp '{value}' (format: YYYY-MM-DD HH:MM:SS).")
+
+    chunks = export_module.iter_chunks(
+        DB_PATH,
+        job_id=request.values.get("job_id") or None,
+        since=bounds["since"],
+        until=bounds["until"],
+        bookmark=request.values.get("incremental") or None,
+        advance_bookmark=request.method == "POST",
+    )
+    filename = f"job_execution_logs.{fmt}"
+
+    if fmt == "parquet":
+        # Parquet needs its footer written last, so spool to a temporary file
+        spool = tempfile.NamedTemporaryFile(suffix=".parquet")
+        try:
+            export_module.write_parquet(chunks, spool.name)
+        except RuntimeError as e:
+            spool.close()
+            abort(501, str(e))
+        response = send_file(spool.name, mimetype=export_module.CONTENT_TYPES[fmt], as_attachment=True, download_name=filename)
+        response.call_on_close(spool.close)
+        return response
+
+    encode = export_module.encode_csv if fmt == "csv" else export_module.encode_jsonl
+    return Response(
+        stream_with_context(encode(chunks)),
+        mimetype=export_module.CONTENT_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 @app.route("/delete_logs/<job_id>")
 def delete_logs(job_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM job_execution_logs WHERE job_id = ?", (job_id,))
-    conn.commit()
-    conn.close()
+    history.delete_logs(DB_PATH, job_id)
     return redirect("/")
 
 